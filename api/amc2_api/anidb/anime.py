@@ -1,4 +1,5 @@
 import logging
+import re
 
 import requests
 
@@ -14,6 +15,8 @@ from typing import List, Optional, Dict, Union, Tuple
 
 _logger = logging.getLogger(__name__)
 
+_is_aid = re.compile(r'[0-9]+').fullmatch
+
 
 class AnidbApiAnimeStore(HTTPObjectStore):
     """
@@ -30,24 +33,26 @@ class AnidbApiAnimeStore(HTTPObjectStore):
     client_id = 'animemetacache'
     client_version = '1'
     base_url: str
+    _url_template: URL
 
     def __init__(self, base_url: str) -> None:
         self.base_url = base_url
+        self._url_template = URL(base_url).with_qs(
+            request='anime',
+            client=self.client_id,
+            clientver=self.client_version,
+            protover='1',
+        )
         super().__init__(req_interval=4, err_interval=30*60)
 
     def _make_url(self, name: str, stat: bool) -> str:
         if name.endswith('.xml'):
             name = name[:-4]
-        if not name.isdigit():
+        # ASCII digits only, str.isdigit() also accepts e.g. superscripts
+        if not _is_aid(name):
             raise ValueError("Anidb aid value is digits only")
         
-        url = URL(self.base_url)
-        url.query['request'] = 'anime'
-        url.query['client'] = self.client_id
-        url.query['clientver'] = self.client_version
-        url.query['protover'] = '1'
-        url.query['aid'] = name
-        return str(url)
+        return str(self._url_template.with_qs(aid=name))
 
     def _handle_api_errors(self, name: str, data: bytes) -> None:
         err = parse_api_error(data)
@@ -85,6 +90,10 @@ class AnidbApiImageStore(HTTPObjectStore):
     """
 
     user_agent = 'animemetacache'
+    # images are the biggest objects, read them in one go
+    stream_content = True
+    # images rarely change, revalidate them instead of downloading them again
+    conditional_get = True
     base_url: str
 
     def __init__(self, base_url: str) -> None:
@@ -111,13 +120,11 @@ class PersistedAnimeRepo:
         self._title_repo = title_repo
     
     def _patch_anime(self, anime: Anime) -> None:
-        title_entries = self._title_repo.find(Title(type='extra', aid=anime.id))
-        anime.titles += [ent.title for ent in title_entries]
+        title_entries = self._title_repo.find(Title.trusted('', anime.id, '', 'extra'))
+        anime.titles.extend(ent.title for ent in title_entries)
     
     def _check_exists(self, aid: str) -> bool:
-        title_entries = self._title_repo.find(Title(aid=aid))
-        title_entries = [ent for ent in title_entries if ent.title.type != 'extra']
-        return bool(title_entries)
+        return self._title_repo.exists(Title.trusted('', aid, '', ''), exclude_types=('extra',))
 
     def get(self, aid: str) -> Optional[AnimeEntry]:
         if not self._check_exists(aid):
@@ -132,7 +139,7 @@ class PersistedAnimeRepo:
             raise RuntimeError(f"Expected xml mime-type, got {anime_xml_obj.content_type}")
         
         try:
-            anime = AnimeXMLParser.parse(anime_xml_obj.data.decode())
+            anime = AnimeXMLParser.parse(anime_xml_obj.data)
         except (UnicodeError, ValueError) as e:
             raise RuntimeError(str(e))
         
@@ -2,76 +2,97 @@ import dataclasses
 import datetime
 import logging
 import io
-import copy
 
-import xml.sax
-import xml.sax.xmlreader
 import xml.etree.ElementTree as ET
 
+try:
+    # optional, faster parser for the huge titles XML
+    from lxml import etree
+except ImportError:
+    etree = None
+
 from amc2_api.model import Title, Episode, Anime, Image, ImageType, CastRole, Rating, Credit, Season
 from amc2_api.utils import URL
 
-from typing import List, Optional, Callable, Dict, Union, Tuple, Callable
+from typing import List, Optional, Callable, Dict, Tuple, Any, IO, Set, ClassVar
 
 _logger = logging.getLogger(__name__)
 
 
-class TitleXMLHandler(xml.sax.ContentHandler):
-    title_handler: Callable[[Title], None]
+def _has_c_elementtree() -> bool:
+    # CPython transparently replaces the pure Python ElementTree with the C accelerator
+    try:
+        import _elementtree # type: ignore
+    except ImportError:
+        return False
+    return ET.Element is _elementtree.Element
+
 
-    _title: Dict[str, str]
-    _aid: str
+if not _has_c_elementtree():
+    _logger.warning("C accelerated xml.etree is not available, parsing XML will be slow")
+
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def _translate_title_type(value: str) -> str:
+    if value == 'syn':
+        return 'synonym'
+    return value
+
+
+def _make_title(aid: str, el: Any) -> Title:
+    return Title.trusted(el.text or '', aid, el.get(XML_LANG, ''), _translate_title_type(el.get('type', '')))
+
+
+def _parse_titles_lxml(source: IO[bytes], title_handler: Callable[[Title], None]) -> None:
+    aid = ''
+    context = etree.iterparse(source, events=('start', 'end'), tag=('anime', 'title'))
+
+    for event, el in context:
+        if event == 'start':
+            # the attributes are complete on start, the children are not
+            if el.tag == 'anime':
+                aid = el.get('aid', '')
+            continue
+
+        if el.tag == 'title':
+            title_handler(_make_title(aid, el))
+
+        # free the already handled elements, the titles XML is huge
+        el.clear(keep_tail=True)
+        while el.getprevious() is not None:
+            del el.getparent()[0]
 
-    def __init__(self, title_handler: Callable[[Title], None]):
-        self.title_handler = title_handler
-        self._title = {}
-        self._aid = ''
-    
-    def _translate_type(self, value: str) -> str:
-        if value == 'syn':
-            return 'synonym'
-        return value
-
-    def _translate_lang(self, value: str) -> str:
-        return value
-
-    def startElement(self, tag: str, attributes: xml.sax.xmlreader.AttributesImpl):
-        if tag.lower() == 'anime':
-            self._aid = attributes['aid']
-        elif tag.lower() == 'title':
-            self._title = {
-                'type': self._translate_type(attributes['type']),
-                'lang': self._translate_lang(attributes['xml:lang']),
-                'value': ''
-            }
-
-    def endElement(self, tag: str) -> None:
-        if tag.lower() == 'title':
-            self._title['aid'] = self._aid
-            title = Title.construct(**self._title)
-            self.title_handler(title)
-            self._title = {}
-
-    def characters(self, content: Union[str, bytes]) -> None:
-        if isinstance(content, bytes):
-            content = content.decode()
-        if 'value' in self._title:
-            self._title['value'] += content
-
-
-def parse_titles_xml(data: str, title_handler: Callable[[Title], None]) -> None:
-    parser = xml.sax.make_parser()
-    handler = TitleXMLHandler(title_handler)
-    parser.setContentHandler(handler)
-
-    source = xml.sax.InputSource()
-    source.setCharacterStream(io.StringIO(data))
-    parser.parse(source)
+
+def _parse_titles_etree(source: IO[bytes], title_handler: Callable[[Title], None]) -> None:
+    aid = ''
+    root: Optional[ET.Element] = None
+
+    for event, el in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = el
+            if el.tag == 'anime':
+                aid = el.get('aid', '')
+        elif el.tag == 'title':
+            title_handler(_make_title(aid, el))
+        elif el.tag == 'anime' and root is not None:
+            # free the already handled animes, the titles XML is huge
+            root.clear()
+
+
+def parse_titles_xml(data: bytes, title_handler: Callable[[Title], None]) -> None:
+    source = io.BytesIO(data)
+    if etree is not None:
+        _parse_titles_lxml(source, title_handler)
+    else:
+        _parse_titles_etree(source, title_handler)
 
 
 def parse_api_error(data: bytes) -> str:
     try:
-        root = ET.fromstring(data.decode())
+        root = ET.fromstring(data)
     except Exception:
         return ''
     
@@ -90,25 +111,30 @@ class AnidbTag:
     def parse_tree(elements: List[ET.Element]) -> List['AnidbTag']:
         all_tags: Dict[str, AnidbTag] = {}
         parents: Dict[str, str] = {}
+        parent_ids: Set[str] = set()
         for el in elements:
             tag, parent_id = AnidbTag.parse(el)
             if tag.name:
                 all_tags[tag.id] = tag
                 parents[tag.id] = parent_id
-        
-        for tag in all_tags.values():
-            tag.parent = all_tags.get(parents[tag.id], None)
+                parent_ids.add(parent_id)
 
-        parent_ids = set(parents.values())
-        return [all_tags[k] for k in all_tags.keys() if k not in parent_ids]
+        # link the parents and collect the leaves in the same pass
+        leaves: List[AnidbTag] = []
+        for tag_id, tag in all_tags.items():
+            tag.parent = all_tags.get(parents[tag_id], None)
+            if tag_id not in parent_ids:
+                leaves.append(tag)
+        return leaves
 
     @classmethod
     def parse(self, el: ET.Element) -> Tuple['AnidbTag', str]:
         name: str = ''
-        if (name_el := el.find('./name')) is not None:
+        if (name_el := el.find('name')) is not None:
             name = name_el.text.strip()
-        parent_id = el.attrib.get('parentid', '').strip()
-        return AnidbTag(id=el.attrib['id'], name=name), parent_id
+        attrib = el.attrib
+        parent_id = attrib.get('parentid', '').strip()
+        return AnidbTag(id=attrib['id'], name=name), parent_id
 
     def path(self) -> List['AnidbTag']:
         path: List[AnidbTag] = []
@@ -128,14 +154,50 @@ class AnimeXMLParser:
     Special episodes are filtered out.
     """
 
+    # Mapping from anidb jobs to tmdb department/known_for_department
+
+    category_map: ClassVar[Dict[str, str]] = {
+        "Character Design": "visual effects",
+        "Original Work": "writing",
+        "Music": "sound",
+        "Animation Work": "visual effects",
+        "Direction": "directing",
+        "Chief Animation Direction": "directing",
+        "Animation Character Design": "visual effects",
+        "Series Composition": "writing",
+    }
+
+    department_map: ClassVar[Dict[str, str]] = {
+        "Character Design": "Art",
+        "Original Work": "Writing",
+        "Music": "Sound",
+        "Animation Work": "Art",
+        "Direction": "Directing",
+        "Chief Animation Direction": "Directing",
+        "Animation Character Design": "Art",
+        "Series Composition": "Writing",
+    }
+
     @classmethod
-    def parse(cls, xml_data: str) -> Anime:
+    def parse(cls, xml_data: bytes) -> Anime:
         try:
             root = ET.fromstring(xml_data)
             return cls().parse_anime(root)
         except ET.ParseError as e:
             raise ValueError("Invalid XML: " + str(e))
     
+    def _find_path(self, el: ET.Element, parent: str, tag: str) -> Optional[ET.Element]:
+        # plain tag names take the fast C path of find()/findall(), real paths 
+        # like './parent/tag' are evaluated by the much slower ElementPath module
+        if (parent_el := el.find(parent)) is None:
+            return None
+        return parent_el.find(tag)
+
+    def _findall_path(self, el: ET.Element, parent: str, tag: str) -> List[ET.Element]:
+        if (parent_el := el.find(parent)) is None:
+            return []
+        return parent_el.findall(tag)
+
     def _parse_str(self, el: Optional[ET.Element], default: str) -> str:
         return el.text if el is not None else default
 
@@ -153,38 +215,14 @@ class AnimeXMLParser:
         ctype = ctype.lower()
 
         creators: List[str] = []
-        for el in creators_el.findall('./name'):
+        for el in creators_el.findall('name'):
             if el.attrib.get('type', '').lower() == ctype and el.text.strip():
                 creators.append(el.text.strip())
         return creators
 
-    def _parse_creators_credits(self, name_el: ET.Element) -> List[Credit]:
-        # Mapping from anidb jobs to tmdb department/known_for_department
-
-        cat_map = {
-            "Character Design": "visual effects",
-            "Original Work": "writing",
-            "Music": "sound",
-            "Animation Work": "visual effects",
-            "Direction": "directing",
-            "Chief Animation Direction": "directing",
-            "Animation Character Design": "visual effects",
-            "Series Composition": "writing",
-        }
-
-        dep_map = {
-            "Character Design": "Art",
-            "Original Work": "Writing",
-            "Music": "Sound",
-            "Animation Work": "Art",
-            "Direction": "Directing",
-            "Chief Animation Direction": "Directing",
-            "Animation Character Design": "Art",
-            "Series Composition": "Writing",
-        }
-
+    def _parse_creators_credits(self, elements: List[ET.Element]) -> List[Credit]:
         credits: List[Credit] = []
-        for el in name_el:
+        for el in elements:
             name = el.text.strip()
             job = el.attrib.get('type', '').strip()
 
@@ -192,8 +230,8 @@ class AnimeXMLParser:
                 credit = Credit(
                     name=name,
                     job=job,
-                    department=dep_map.get(job, ''),
-                    category=cat_map.get(job, ''),
+                    department=self.department_map.get(job, ''),
+                    category=self.category_map.get(job, ''),
                 )
                 credits.append(credit)
         return credits
@@ -254,15 +292,29 @@ class AnimeXMLParser:
         return Rating(source='anidb', average=average, votes=votes)
     
     def parse_episode(self, el: ET.Element, specials: bool = False) -> Optional[Episode]:
-        ep_type, ep_no = self.parse_epno(el.find('./epno'))
+        ep_type, ep_no = self.parse_epno(el.find('epno'))
         if (not specials and ep_type != 1) or (specials and ep_type != 2):
             return None
-
-        length = self._parse_int(el.find('./length'), 0)
-        airdate = self._parse_date(el.find('./airdate'), '0001-01-01')
-        summary = self._parse_str(el.find('./summary'), '').strip()
-        titles = [self.parse_title(t) for t in el.findall('./title')]
-        rating = self.parse_rating(el.find('./rating'))
+        return self._make_episode(el, ep_no)
+
+    def _parse_episodes(self, el: ET.Element) -> Tuple[List[Episode], List[Episode]]:
+        # a single pass over the episodes, returns the regular ones and the specials
+        regular: List[Episode] = []
+        specials: List[Episode] = []
+        for ep_el in self._findall_path(el, 'episodes', 'episode'):
+            ep_type, ep_no = self.parse_epno(ep_el.find('epno'))
+            if ep_type == 1:
+                regular.append(self._make_episode(ep_el, ep_no))
+            elif ep_type == 2:
+                specials.append(self._make_episode(ep_el, ep_no))
+        return regular, specials
+
+    def _make_episode(self, el: ET.Element, ep_no: int) -> Episode:
+        length = self._parse_int(el.find('length'), 0)
+        airdate = self._parse_date(el.find('airdate'), '0001-01-01')
+        summary = self._parse_str(el.find('summary'), '').strip()
+        titles = [self.parse_title(t) for t in el.findall('title')]
+        rating = self.parse_rating(el.find('rating'))
 
         return Episode(
             number=ep_no,
@@ -276,12 +328,12 @@ class AnimeXMLParser:
     
     def parse_character(self, el: ET.Element) -> Optional[CastRole]:
         # note: seiyuu is the voice actor of an anime character
-        seiyuu = el.find('./seiyuu')
+        seiyuu = el.find('seiyuu')
         if seiyuu is None:
             # don't return characters without cast
             return None
 
-        char_img_el = el.find('./picture')
+        char_img_el = el.find('picture')
         if char_img_el is not None:
             char_img = char_img_el.text.strip().strip('/')
         else:
@@ -290,7 +342,7 @@ class AnimeXMLParser:
         seiyuu_img = seiyuu.attrib.get('picture', '').strip().strip('/')
         
         role = CastRole(
-            character=self._parse_str(el.find('./name'), '').strip(),
+            character=self._parse_str(el.find('name'), '').strip(),
             actor=seiyuu.text.strip(),
         )
 
@@ -300,70 +352,65 @@ class AnimeXMLParser:
             role.actor_image = Image(type=ImageType.thumb, name=seiyuu_img, source='anidb')
         return role
 
-    def _parse_season(self, anime: Anime, el: ET.Element) -> Season:
-        eps = [self.parse_episode(e, False) for e in el.findall('./episodes/episode')]
-        eps = [e for e in eps if e is not None]
-
+    def _parse_season(self, anime: Anime, eps: List[Episode]) -> Season:
+        # no need to copy: the model validation creates new containers, 
+        # strings and dates are immutable, images, ratings and credits are frozen
         return Season(
             id=anime.id, 
             number=1,
-            uniqueids=copy.deepcopy(anime.uniqueids),
-            titles=copy.deepcopy(anime.titles), 
+            uniqueids=anime.uniqueids,
+            titles=anime.titles, 
 
-            description=copy.deepcopy(anime.description),
-            genres=copy.deepcopy(anime.genres), 
-            tags=copy.deepcopy(anime.tags),
-            airdate=copy.deepcopy(anime.airdate),
+            description=anime.description,
+            genres=anime.genres, 
+            tags=anime.tags,
+            airdate=anime.airdate,
             episodes=eps,
-            images=copy.deepcopy(anime.images),
-            ratings=copy.deepcopy(anime.ratings),
+            images=anime.images,
+            ratings=anime.ratings,
 
-            cast=copy.deepcopy(anime.cast),
-            directors=copy.deepcopy(anime.directors),
-            credits=copy.deepcopy(anime.credits),
+            cast=anime.cast,
+            directors=anime.directors,
+            credits=anime.credits,
         )
     
-    def _parse_specials(self, anime: Anime, el: ET.Element) -> Season:
-        eps = [self.parse_episode(e, True) for e in el.findall('./episodes/episode')]
-        eps = [e for e in eps if e is not None]
-
+    def _parse_specials(self, anime: Anime, eps: List[Episode]) -> Season:
         return Season(
             id=anime.id, 
             number=0,
-            uniqueids=copy.deepcopy(anime.uniqueids),
+            uniqueids=anime.uniqueids,
             titles=[Title(value='Specials', type='main', lang='en')], 
             episodes=eps,
         )
 
     def parse_anime(self, el: ET.Element) -> Anime:
         aid = el.attrib['id']
-        descr = self._parse_str(el.find('./description'), '').strip()
-        imgs = [self.parse_image(e) for e in el.findall('./picture')]
+        descr = self._parse_str(el.find('description'), '').strip()
+        imgs = [self.parse_image(e) for e in el.findall('picture')]
 
-        titles = [self.parse_title(t) for t in el.findall('./titles/title')]
+        titles = [self.parse_title(t) for t in self._findall_path(el, 'titles', 'title')]
         for title in titles:
             title.aid = aid
 
-        eps = [self.parse_episode(e) for e in el.findall('./episodes/episode')]
-        eps = [e for e in eps if e is not None]
+        eps, specials = self._parse_episodes(el)
 
-        chars = [self.parse_character(c) for c in el.findall('./characters/character')]
-        chars = [c for c in chars if c is not None]
+        char_els = self._findall_path(el, 'characters', 'character')
+        chars = [c for c in map(self.parse_character, char_els) if c is not None]
 
         airdate: Optional[datetime.date] = None
-        if (sdate_el := el.find('./startdate')) is not None and sdate_el.text:
+        if (sdate_el := el.find('startdate')) is not None and sdate_el.text:
             airdate = self._parse_date(sdate_el, '0001-01-01')
 
-        creators_el = el.find('./creators')
+        creators_el = el.find('creators')
         directors = self._parse_creators(creators_el, 'Direction')
         
         rating: Optional[Rating] = None
-        if (rating_el := el.find('./ratings/permanent')) is not None:
+        if (rating_el := self._find_path(el, 'ratings', 'permanent')) is not None:
             rating = self.parse_rating(rating_el, votes_attr='count')
 
-        tags = self._parse_tags(el.findall('./tags/tag'))
+        tags = self._parse_tags(self._findall_path(el, 'tags', 'tag'))
 
-        credits = self._parse_creators_credits(el.findall('./creators/name'))
+        credits = self._parse_creators_credits(self._findall_path(el, 'creators', 'name'))
 
         anime = Anime(
             id='A' + aid, 
@@ -381,8 +428,8 @@ class AnimeXMLParser:
         )
 
         anime.seasons = [
-            self._parse_specials(anime, el),
-            self._parse_season(anime, el)
+            self._parse_specials(anime, specials),
+            self._parse_season(anime, eps)
         ]
 
         return anime
@@ -12,7 +12,7 @@ from amc2_api.persistence import Persisted, PersistedStat, ObjectNotFound, Objec
 
 from .parse import parse_titles_xml
 
-from typing import List, Optional, Dict, Union, Tuple
+from typing import List, Optional, Dict, Union, Tuple, Sequence
 
 _logger = logging.getLogger(__name__)
 
@@ -20,6 +20,9 @@ _logger = logging.getLogger(__name__)
 class AnidbApiTitleStore(HTTPObjectStore):
     titles_url: str
     user_agent = 'animemetacache'
+    # the titles file is big and only changes once a day
+    conditional_get = True
+    stream_content = True
     client_id = 'animemetacache'
     client_version = '1'
 
@@ -30,13 +33,15 @@ class AnidbApiTitleStore(HTTPObjectStore):
     def _make_url(self, name: str, stat: bool) -> str:
         return self.titles_url
 
-    def stat(self, name: str) -> PersistedStat:
-        # Don't actually reach out to the API. By definition always fresh.
-        return PersistedStat(content_type='text/xml')
-
     def _make_content(self, name: str, response: requests.Response) -> bytes:
         # note: requests handles gzip transport encoding, not gzip file download
-        return gzip.decompress(response.content)
+        # decompress while downloading, the compressed file is never held as a whole
+        try:
+            response.raw.decode_content = True
+            with gzip.GzipFile(fileobj=response.raw) as fh:
+                return fh.read()
+        finally:
+            response.close()
 
     def stat(self, name: str) -> PersistedStat:
         # Don't actually reach out to the API. By definition always fresh.
@@ -70,59 +75,108 @@ class SqliteTitleRepo(TitleRepo):
         )
     '''
 
+    # lookups by aid already use the primary key index
+    _ddl_index = 'CREATE INDEX IF NOT EXISTS titles_value ON titles (value)'
+
     def __init__(self, dbfile: str = ':memory:') -> None:
         self._lock = threading.RLock()
         self._conn = sqlite3.connect(dbfile, check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
+        if dbfile != ':memory:':
+            # an in-memory database keeps its memory journal
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA temp_store=MEMORY')
         self._conn.execute(self._ddl)
+        self._conn.execute(self._ddl_index)
 
-    def find(self, title: Title) -> List[TitleEntry]:
-        query = 'SELECT aid, type, lang, value, age FROM titles WHERE '
+    def _where(self, title: Title) -> Dict[str, str]:
         data: Dict[str, str] = {}
 
         if title.value:
             data['value'] = title.value
         if title.lang:
-            data['title'] = title.lang
+            data['lang'] = title.lang
         if title.type:
             data['type'] = title.type
         if title.aid:
             data['aid'] = title.aid
-        
+        return data
+
+    def find(self, title: Title) -> List[TitleEntry]:
+        data = self._where(title)
         if not data:
             # don't allow listing the full database (not so useful anyway)
             return []
         
-        query += 'AND'.join([f' {k} = ? ' for k in data.keys()])
+        # the column order is fixed, thus each combination of fields always results 
+        # in the same SQL string, which is then reused from the statement cache
+        query = 'SELECT aid, type, lang, value, age FROM titles WHERE '
+        query += ' AND '.join([f'{k} = ?' for k in data.keys()])
 
         result = []
         with self._lock:
             for row in self._conn.execute(query, tuple(data.values())):
-                ftitle = Title(
-                    value=row['value'], 
-                    aid=row['aid'],
-                    lang=row['lang'], 
-                    type=row['type']
-                )
+                ftitle = Title.trusted(row['value'], row['aid'], row['lang'], row['type'])
                 age = datetime.datetime.fromisoformat(row['age'])
-                result.append(TitleEntry(title=ftitle, age=age))
+                result.append(TitleEntry.trusted(ftitle, age))
         return result
+
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        data = self._where(title)
+        if not data:
+            return False
+
+        query = 'SELECT 1 FROM titles WHERE '
+        query += ' AND '.join([f'{k} = ?' for k in data.keys()])
+        params = tuple(data.values())
+        if exclude_types:
+            query += f' AND type NOT IN ({", ".join("?" * len(exclude_types))})'
+            params += tuple(exclude_types)
+        query += ' LIMIT 1'
+
+        with self._lock:
+            return self._conn.execute(query, params).fetchone() is not None
     
-    def store(self, title: TitleEntry) -> None:
-        query = 'INSERT INTO titles (aid, type, lang, value, age) VALUES (?, ?, ?, ?, ?)'
-        data = (
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        result: Dict[str, List[TitleEntry]] = {}
+
+        # stay below the SQLITE_MAX_VARIABLE_NUMBER of older sqlite versions
+        chunk_size = 500
+        for i in range(0, len(aids), chunk_size):
+            chunk = aids[i:i+chunk_size]
+            query = 'SELECT aid, type, lang, value, age FROM titles'
+            query += f' WHERE aid IN ({", ".join("?" * len(chunk))})'
+
+            with self._lock:
+                for row in self._conn.execute(query, tuple(chunk)):
+                    ftitle = Title.trusted(row['value'], row['aid'], row['lang'], row['type'])
+                    age = datetime.datetime.fromisoformat(row['age'])
+                    result.setdefault(ftitle.aid, []).append(TitleEntry.trusted(ftitle, age))
+        return result
+
+    def _to_row(self, title: TitleEntry) -> Tuple[str, str, str, str, str]:
+        return (
             title.title.aid,
             title.title.type,
             title.title.lang,
             title.title.value,
             title.age.isoformat()
         )
-        with self._lock:
-            self._conn.execute(query, data)
+
+    def store(self, title: TitleEntry) -> None:
+        query = 'INSERT INTO titles (aid, type, lang, value, age) VALUES (?, ?, ?, ?, ?)'
+        with self._lock, self._conn:
+            self._conn.execute(query, self._to_row(title))
+
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        query = 'INSERT INTO titles (aid, type, lang, value, age) VALUES (?, ?, ?, ?, ?)'
+        with self._lock, self._conn:
+            self._conn.executemany(query, [self._to_row(t) for t in titles])
     
     def purge(self) -> None:
         query = 'DELETE FROM titles'
-        with self._lock:
+        with self._lock, self._conn:
             self._conn.execute(query)
 
     def remove(self, title: Title) -> None:
@@ -132,20 +186,23 @@ class SqliteTitleRepo(TitleRepo):
         query = 'DELETE FROM titles WHERE value = ?'
         data = [title.value]
         if title.aid:
-            query += 'AND aid = ? '
+            query += ' AND aid = ?'
             data.append(title.aid)
         if title.lang:
-            query += 'AND title = ? '
+            query += ' AND lang = ?'
             data.append(title.lang)
         if title.type:
-            query += 'AND type = ? '
+            query += ' AND type = ?'
             data.append(title.type)
 
-        with self._lock:
+        with self._lock, self._conn:
             self._conn.execute(query, data)
     
 
 class XMLTitleRepo(TitleRepo):
+    # number of titles inserted into the backend at once
+    batch_size: int = 5000
+
     _repo: TitleRepo
 
     def __init__(self, backend: Optional[TitleRepo] = None) -> None:
@@ -154,23 +211,39 @@ class XMLTitleRepo(TitleRepo):
         else:
             self._repo = SqliteTitleRepo(':memory:')
     
-    def parse_data(self, data: str, age: Optional[datetime.datetime] = None) -> None:
+    def parse_data(self, data: bytes, age: Optional[datetime.datetime] = None) -> None:
         if not data:
             return
         
         if age is None:
             age = datetime.datetime.now(tz=datetime.timezone.utc)
         
+        batch: List[TitleEntry] = []
+
         def handle_title(title: Title) -> None:
-            self._repo.store(TitleEntry(title=title, age=age))
+            batch.append(TitleEntry.trusted(title, age))
+            if len(batch) >= self.batch_size:
+                self._repo.store_many(batch)
+                batch.clear()
 
         parse_titles_xml(data, handle_title)
+        if batch:
+            self._repo.store_many(batch)
         
     def find(self, title: Title) -> List[TitleEntry]:
         return self._repo.find(title)
 
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        return self._repo.exists(title, exclude_types)
+
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        return self._repo.find_by_aids(aids)
+
     def store(self, title: TitleEntry) -> None:
         self._repo.store(title)
+
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        self._repo.store_many(titles)
     
     def purge(self) -> None:
         self._repo.purge()
@@ -188,10 +261,25 @@ class OverlayTitleRepo(TitleRepo):
         self.overlay = upper
 
     def find(self, title: Title) -> List[TitleEntry]:
-        return self.base.find(title) + self.overlay.find(title)
+        # the repos return a fresh list per call, extend it instead of concatenating
+        result = self.base.find(title)
+        result.extend(self.overlay.find(title))
+        return result
+
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        return self.base.exists(title, exclude_types) or self.overlay.exists(title, exclude_types)
+
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        result = self.base.find_by_aids(aids)
+        for aid, titles in self.overlay.find_by_aids(aids).items():
+            result.setdefault(aid, []).extend(titles)
+        return result
     
     def store(self, title: TitleEntry) -> None:
         self.overlay.store(title)
+
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        self.overlay.store_many(titles)
     
     def purge(self) -> None:
         self.overlay.purge()
@@ -201,39 +289,90 @@ class OverlayTitleRepo(TitleRepo):
 
 
 class PeristsedTitleRepo:
+    """
+    The titles are reloaded when the titles file expires. The reload parses 
+    into a new repo in a background thread while the readers keep using the
+    old repo, which is swapped out once the new one is complete.
+    Only the very first load blocks the readers.
+    A failed reload is retried after ``retry_interval`` seconds.
+    """
+
+    retry_interval: float = 60
+
     _xml_store: ObjectStore
-    _xml_repo: XMLTitleRepo
+    _extra_titles: TitleRepo
     _repo: TitleRepo
 
-    _lock: threading.RLock
+    _reload_lock: threading.Lock
     _valid_until: float
+    _loaded_version: Optional[Tuple[float, str]]
 
     def __init__(self, xml_store: ObjectStore, extra_titles: TitleRepo) -> None:
         self._xml_store = xml_store
-        self._xml_repo = XMLTitleRepo()
-        self._repo = OverlayTitleRepo(self._xml_repo, extra_titles)
+        self._extra_titles = extra_titles
+        self._repo = OverlayTitleRepo(XMLTitleRepo(), extra_titles)
 
-        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
         self._valid_until = float("-inf")
+        self._loaded_version = None
 
-    def _load(self):
-        # make sure to reload the titles when the app runs for a long time
-        if self._valid_until < time.time():
-            obj = self._xml_store.get('anime-titles.xml')
+    def _load(self) -> None:
+        obj = self._xml_store.get('anime-titles.xml')
+        version = (obj.last_modified, obj.etag)
+
+        # don't parse the same file again (e.g. on HTTP 304 Not Modified)
+        if version != self._loaded_version:
             age = datetime.datetime.fromtimestamp(obj.last_modified)
+            xml_repo = XMLTitleRepo()
+            xml_repo.parse_data(obj.data, age=age)
+            # rebinding the attribute is atomic, readers see the old or the new repo
+            self._repo = OverlayTitleRepo(xml_repo, self._extra_titles)
+            self._loaded_version = version
+
+        self._valid_until = obj.expiry_time()
+
+    def _background_load(self) -> None:
+        try:
+            self._load()
+        except Exception as e:
+            _logger.error("Failed to reload the anidb titles: " + str(e))
+            # keep serving the old titles, don't try again on every request
+            self._valid_until = time.time() + self.retry_interval
+        finally:
+            self._reload_lock.release()
+
+    def _refresh(self) -> None:
+        # make sure to reload the titles when the app runs for a long time
+        if self._valid_until >= time.time():
+            return
 
-            self._xml_repo.purge()
-            self._xml_repo.parse_data(obj.data.decode(), age=age)
-            self._valid_until = obj.expiry_time()
+        if self._loaded_version is None:
+            # nothing to serve yet, wait for the first load
+            with self._reload_lock:
+                if self._loaded_version is None:
+                    self._load()
+        elif self._reload_lock.acquire(blocking=False):
+            # the lock is released by the background thread
+            threading.Thread(target=self._background_load, daemon=True).start()
     
     def find(self, title: Title) -> List[TitleEntry]:
-        with self._lock:
-            self._load()
-            return self._repo.find(title)
+        self._refresh()
+        return self._repo.find(title)
+
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        self._refresh()
+        return self._repo.exists(title, exclude_types)
+
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        self._refresh()
+        return self._repo.find_by_aids(aids)
     
     def store(self, title: TitleEntry) -> None:
         self._repo.store(title)
 
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        self._repo.store_many(titles)
+
     def purge(self) -> None:
         pass
     
@@ -1,19 +1,28 @@
 import logging
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
-from .config import settings
+from .config import get_settings
 
-logging.basicConfig(level=settings.logging_level.value)
+logging.basicConfig(level=get_settings().logging_level.value)
 
 from .routers.anidb import router as anidb_router
 from .routers.tmdb import router as tmdb_router
 from .routers.anime import router as anime_router
 from .routers.match import router as match_router
+from .dependencies import Databases
 
 # TODO: implement /find/ endpoints to find anime by title without matching
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.include_router(anidb_router)
 app.include_router(tmdb_router)
 app.include_router(anime_router)
 app.include_router(match_router)
+
+
+@app.on_event("startup")
+def create_databases() -> None:
+    # the repos are shared by all requests, build them once
+    app.state.dbs = Databases()
+
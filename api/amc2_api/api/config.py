@@ -1,4 +1,5 @@
 import enum
+import functools
 
 from pydantic import BaseSettings, validator
 
@@ -61,4 +62,6 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
-settings = Settings()
\ No newline at end of file
+@functools.lru_cache
+def get_settings() -> Settings:
+    return Settings()
@@ -1,14 +1,15 @@
 import logging
-import functools
+import threading
 
-from amc2_api.model import TitleRepo, AnimeRepo
+from amc2_api.model import TitleRepo, AnimeRepo, CachedAnimeRepo
 from amc2_api import anidb
 from amc2_api import tmdb
 from amc2_api.mapping import anime_mapping_repo as anime_mapping_repo_factory
 from amc2_api.mapping import AnimeMappingRepo
 from amc2_api.persistence import CachedObjectStore, ObjectStore, object_store_factory
 from amc2_api.utils import URL
-from .config import settings
+from fastapi import Request
+from .config import get_settings
 
 from typing import Optional
 
@@ -31,18 +32,33 @@ class Databases:
     def __init__(self) -> None:
         self.anidb_titles = anidb_title_repo()
         self.anidb_animes_raw = anidb_anime_store()
-        self.anidb_animes = anidb_anime_repo()
+        self.anidb_animes = anidb_anime_repo(self.anidb_animes_raw, self.anidb_titles)
         self.anidb_images = anidb_image_store()
 
         self.tmdb_titles = tmdb_title_repo()
         self.tmdb_shows_raw = tmdb_show_store()
-        self.tmdb_animes = tmdb_anime_repo()
+        self.tmdb_animes = tmdb_anime_repo(self.tmdb_shows_raw)
         self.tmdb_images = tmdb_image_store()
 
         self.anime_mapping = anime_mapping_repo()
 
 
+_databases_lock = threading.Lock()
+
+
+def get_databases(request: Request) -> Databases:
+    # normally built once on startup (see amc2_api.api), the lock only guards 
+    # against concurrent first requests building it twice when it was not
+    state = request.app.state
+    if (dbs := getattr(state, 'dbs', None)) is None:
+        with _databases_lock:
+            if (dbs := getattr(state, 'dbs', None)) is None:
+                dbs = state.dbs = Databases()
+    return dbs
+
+
 def tmdb_api_url(base: str = 'https://api.themoviedb.org/3') -> URL:
+    settings = get_settings()
     if not settings.tmdb_api_key:
         raise ValueError("The TMDB_API_KEY variable mus not be empty")
     url = URL(base)
@@ -50,8 +66,8 @@ def tmdb_api_url(base: str = 'https://api.themoviedb.org/3') -> URL:
     return url
 
 
-@functools.lru_cache
 def anidb_title_repo() -> TitleRepo:
+    settings = get_settings()
     ttl = settings.anidb_titles_cache_time
     raw_store = anidb.titles.anidb_titles_store(settings.anidb_titles_url)
     cache_store = object_store_factory(settings.anidb_titles_cache_url)
@@ -60,56 +76,53 @@ def anidb_title_repo() -> TitleRepo:
     return anidb.titles.PeristsedTitleRepo(titles_store, extra_repo)
 
 
-@functools.lru_cache
 def anidb_anime_store() -> ObjectStore:
+    settings = get_settings()
     ttl = settings.anidb_api_cache_time
     raw = anidb.anime.anidb_anime_store(settings.anidb_api_url)
     cache = object_store_factory(settings.anidb_api_cache_url)
-    return CachedObjectStore(raw, cache, ttl)
+    return CachedObjectStore(raw, cache, ttl, refresh_in_background=True)
 
 
-@functools.lru_cache
 def anidb_image_store() -> ObjectStore:
+    settings = get_settings()
     ttl = settings.anidb_image_cache_time
     raw = anidb.anime.anidb_image_store(settings.anidb_image_url)
     cache = object_store_factory(settings.anidb_image_cache_url)
-    return CachedObjectStore(raw, cache, ttl)
+    return CachedObjectStore(raw, cache, ttl, refresh_in_background=True)
 
 
-@functools.lru_cache
-def anidb_anime_repo() -> AnimeRepo:
-    title_repo = anidb_title_repo()
-    anime_store = anidb_anime_store()
-    return anidb.anime.PersistedAnimeRepo(anime_store, title_repo)
+def anidb_anime_repo(anime_store: ObjectStore, title_repo: TitleRepo) -> AnimeRepo:
+    # keep the parsed anime for a fraction of the raw XML cache time
+    ttl = get_settings().anidb_api_cache_time / 4
+    return CachedAnimeRepo(anidb.anime.PersistedAnimeRepo(anime_store, title_repo), ttl)
 
 
-@functools.lru_cache
 def tmdb_show_store() -> ObjectStore:
+    settings = get_settings()
     ttl = settings.tmdb_api_cache_time
     raw = tmdb.shows.tmdb_show_store(str(tmdb_api_url()))
     cache = object_store_factory(settings.tmdb_api_cache_url)
-    return CachedObjectStore(raw, cache, ttl)
+    return CachedObjectStore(raw, cache, ttl, refresh_in_background=True)
 
 
-@functools.lru_cache
 def tmdb_image_store() -> ObjectStore:
+    settings = get_settings()
     ttl = settings.tmdb_image_cache_time
     raw = tmdb.shows.tmdb_image_store(str(tmdb_api_url()))
     cache = object_store_factory(settings.tmdb_image_cache_url)
-    return CachedObjectStore(raw, cache, ttl)
+    return CachedObjectStore(raw, cache, ttl, refresh_in_background=True)
 
 
-@functools.lru_cache
-def tmdb_anime_repo() -> AnimeRepo:
-    show_store = tmdb_show_store()
-    return tmdb.shows.PersistedTmdbAnimeRepo(show_store)
+def tmdb_anime_repo(show_store: ObjectStore) -> AnimeRepo:
+    ttl = get_settings().tmdb_api_cache_time / 4
+    return CachedAnimeRepo(tmdb.shows.PersistedTmdbAnimeRepo(show_store), ttl)
 
 
-@functools.lru_cache
 def tmdb_title_repo() -> TitleRepo:
     return tmdb.titles.TmdbApiTitleRepo(str(tmdb_api_url()))
 
 
-@functools.lru_cache
 def anime_mapping_repo() -> AnimeMappingRepo:
+    settings = get_settings()
     return anime_mapping_repo_factory(settings.anime_mapping_url)
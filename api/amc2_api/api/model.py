@@ -1,4 +1,6 @@
 import datetime
+import functools
+import urllib.parse
 
 from pydantic import BaseModel, Field
 from pydantic.generics import GenericModel
@@ -36,14 +38,21 @@ class CollectionView(GenericModel, Generic[T]):
         underscore_attrs_are_private = False
 
 
+@functools.lru_cache(maxsize=16)
+def _section_url(selfurl: str, section: str) -> str:
+    # parsing and joining the base URL per link is costly, while the links 
+    # only append an id or a name to the URL of their API section
+    return str(URL(selfurl).joinpath(section)) + '/'
+
+
 def anime_link(
     selfurl: str, 
     anime_id: Union[str, AnidbId, TmdbId, AnimeMappingId], 
     method: str = 'GET'
 ) -> Link:
     #aid = AnimeId(anime_id)
-    url = URL(selfurl).joinpath('anime', str(anime_id))
-    return Link(href=str(url), method=method)
+    url = _section_url(selfurl, 'anime') + str(anime_id)
+    return Link.construct(href=url, method=method)
 
 
 class TitleView(ViewBaseModel):
@@ -56,6 +65,13 @@ class TitleView(ViewBaseModel):
         return TitleView.construct(title=obj.value, lang=obj.lang, type=obj.type)
 
 
+# image sources and the API section serving their images
+_image_sections = {
+    'anidb': 'anidb/images',
+    'tmdb': 'tmdb/images',
+}
+
+
 class ImageView(ViewBaseModel):
     source: str
     name: str
@@ -64,15 +80,11 @@ class ImageView(ViewBaseModel):
 
     @classmethod
     def from_model(cls, obj: Image, selfurl: str) -> 'ImageView':
-        url = ''
-        if obj.source == 'anidb':
-            url = str(URL(selfurl).joinpath('anidb/images', obj.name))
-        elif obj.source == 'tmdb':
-            url = str(URL(selfurl).joinpath('tmdb/images', obj.name))
-        
         img = ImageView.construct(source=obj.source, name=obj.name, type=obj.type)
-        if url:
-            img.links['image'] = Link(href=url, method='GET')
+        if (section := _image_sections.get(obj.source)) is not None:
+            # a single path segment, as the {name} parameter of the image routes
+            url = _section_url(selfurl, section) + urllib.parse.quote(obj.name, safe='')
+            img.links['image'] = Link.construct(href=url, method='GET')
         return img
 
 
@@ -84,7 +96,7 @@ class CastRoleView(ViewBaseModel):
 
     @classmethod
     def from_model(cls, obj: CastRole, selfurl: str) -> 'CastRoleView':
-        view = CastRoleView(
+        view = CastRoleView.construct(
             character=obj.character,
             actor=obj.actor,
         )
@@ -103,7 +115,7 @@ class CreditView(ViewBaseModel):
 
     @classmethod
     def from_model(cls, obj: Credit) -> 'CastRoleView':
-        return CreditView(
+        return CreditView.construct(
             name=obj.name,
             job=obj.job,
             department=obj.department,
@@ -118,7 +130,7 @@ class RatingView(ViewBaseModel):
 
     @classmethod
     def from_model(cls, obj: Rating) -> 'RatingView':
-        return RatingView(source=obj.source, average=obj.average, votes=obj.votes)
+        return RatingView.construct(source=obj.source, average=obj.average, votes=obj.votes)
 
 
 class EpisodeView(ViewBaseModel):
@@ -173,12 +185,12 @@ class SeasonView(ViewBaseModel):
             uniqueids=obj.uniqueids,
             titles=[TitleView.from_model(t) for t in obj.titles],
             description=obj.description,
-            genres=list(obj.genres),
-            tags=list(obj.tags),
+            genres=obj.genres,
+            tags=obj.tags,
             episodes=[EpisodeView.from_model(ep, selfurl) for ep in obj.episodes],            
             images=[ImageView.from_model(i, selfurl) for i in obj.images],
             cast=[CastRoleView.from_model(c, selfurl) for c in obj.cast],
-            directors=list(obj.directors),
+            directors=obj.directors,
             airdate=obj.airdate,
             ratings=[RatingView.from_model(r) for r in obj.ratings],
             credits=[CreditView.from_model(c) for c in obj.credits],
@@ -212,27 +224,27 @@ class AnimeView(ViewBaseModel):
             uniqueids=obj.uniqueids,
             titles=[TitleView.from_model(t) for t in obj.titles],
             description=obj.description,
-            genres=list(obj.genres),
-            tags=list(obj.tags),
+            genres=obj.genres,
+            tags=obj.tags,
             seasons=[SeasonView.from_model(s, selfurl) for s in obj.seasons],            
             images=[ImageView.from_model(i, selfurl) for i in obj.images],
             cast=[CastRoleView.from_model(c, selfurl) for c in obj.cast],
-            directors=list(obj.directors),
+            directors=obj.directors,
             airdate=obj.airdate,
             ratings=[RatingView.from_model(r) for r in obj.ratings],
             credits=[CreditView.from_model(c) for c in obj.credits],
         )
 
 
-class TitleMappingView(ViewBaseModel):
+class _TitleMappingAnime(BaseModel):
+    title: TitleView
+    id: str
 
-    class _Anime(BaseModel):
-        title: TitleView
-        id: str
 
+class TitleMappingView(ViewBaseModel):
     anime_id: str
-    anidb: _Anime
-    tmdb: _Anime
+    anidb: _TitleMappingAnime
+    tmdb: _TitleMappingAnime
     links: LinksCollection = LinksField()
 
     @classmethod
@@ -245,17 +257,17 @@ class TitleMappingView(ViewBaseModel):
 
         view = TitleMappingView.construct(
             anime_id=str(AnimeMappingId(anidb=anidb_id, tmdb=tmdb_id)),
-            anidb=TitleMappingView._Anime(title=anidb_title, id=obj.anidb.aid),
-            tmdb=TitleMappingView._Anime(title=tmdb_title, id=obj.tmdb.aid),
+            anidb=_TitleMappingAnime.construct(title=anidb_title, id=obj.anidb.aid),
+            tmdb=_TitleMappingAnime.construct(title=tmdb_title, id=obj.tmdb.aid),
         )
 
         view.links['anime'] = anime_link(selfurl, view.anime_id)
 
-        match_url = URL(selfurl).joinpath('match', view.anime_id)
+        match_url = _section_url(selfurl, 'match') + view.anime_id
         if not obj.is_from_storage:
-            view.links['remember'] = Link(href=str(match_url), method='PUT')
+            view.links['remember'] = Link.construct(href=match_url, method='PUT')
         else:
-            view.links['forget'] = Link(href=str(match_url), method='DELETE')
+            view.links['forget'] = Link.construct(href=match_url, method='DELETE')
 
         return view
 
@@ -267,24 +279,23 @@ class AnimeMappingView(ViewBaseModel):
 
     @classmethod
     def from_model(cls, obj: AnimeMapping, selfurl: str) -> 'AnimeMappingView':
-        anidb_id = AnidbId(obj.anidb)
-        tmdb_id = TmdbSeasonId(obj.tmdb)
-        aid = f"{anidb_id}-{tmdb_id}"
+        aid = AnimeMappingId(anidb=AnidbId(obj.anidb), tmdb=TmdbSeasonId(obj.tmdb))
+        anime_id = str(aid)
 
         uniqueids = {
-            'anidb': aid.anidb, 
-            'tmdb': str(aid.tmdb.tvshow),
-            'tmdb_season': str(aid.tmdb.season),
+            'anidb': str(aid.anidb_show), 
+            'tmdb': str(aid.tmdb_show),
+            'tmdb_season': str(aid.tmdb_season),
         }
 
-        view = AnimeMappingView(
-            anime_id=str(aid),
+        view = AnimeMappingView.construct(
+            anime_id=anime_id,
             uniqueids=uniqueids,
         )
 
-        view.links['anime'] = anime_link(selfurl, view.anime_id)
+        view.links['anime'] = anime_link(selfurl, anime_id)
 
-        match_url = URL(selfurl).joinpath('match', view.anime_id)
-        view.links['forget'] = Link(href=str(match_url), method='DELETE')
+        match_url = _section_url(selfurl, 'match') + anime_id
+        view.links['forget'] = Link.construct(href=match_url, method='DELETE')
 
         return view
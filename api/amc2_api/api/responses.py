@@ -1,13 +1,87 @@
 import email.utils
+import functools
+import math
+import time
+import orjson
 from starlette.background import BackgroundTask
 from fastapi import Response, HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 
 from amc2_api.persistence import Persisted, PersistedStat
 
-from typing import Optional, Mapping
+from typing import Optional, Mapping, Dict, Any, Type, Tuple
+
+
+# used when the object never expires from the cache
+DEFAULT_MAX_AGE = 24*60*60
+
+
+@functools.lru_cache(maxsize=4096)
+def _http_date(timestamp: int) -> str:
+    # the last modified times are stable per object, format each only once
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def _is_not_modified(content: PersistedStat, if_modified_since: Optional[str]) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have a resolution of one second
+    return int(content.last_modified) <= since
+
+
+def _persisted_headers(content: PersistedStat, headers: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    headers = dict(headers) if headers is not None else {}
+    headers['last-modified'] = _http_date(int(content.last_modified))
+
+    # clients may keep the object as long as our cache does
+    max_age = content.expiry_time() - time.time()
+    if math.isinf(max_age):
+        max_age = DEFAULT_MAX_AGE
+    headers['cache-control'] = f'public, max-age={max(0, int(max_age))}'
+    return headers
+
+
+def _parse_range(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single ``bytes=`` range into the (start, end) offsets, with end
+    exclusive. Returns None to serve the whole object (no, multiple or 
+    malformed ranges), raises ValueError if the range is not satisfiable.
+    """
+    if not value or not value.startswith('bytes=') or ',' in value:
+        return None
+    first, sep, last = value[6:].strip().partition('-')
+    if not sep or not (first + last).isdigit():
+        return None
+
+    if not first:
+        # suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            # syntactically invalid (RFC 7233 2.1), the header is ignored
+            return None
+        end = min(size, int(last) + 1) if last else size
+    
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
 
 
 class PersistedResponse(Response):
+    """
+    Answers with an empty 304 Not Modified if the object did not change 
+    since the given ``If-Modified-Since`` request header.
+
+    Serves a single byte range of the object (206 Partial Content) if 
+    asked to with the ``Range`` request header.
+    """
+
     def __init__(
         self,
         content: Persisted,
@@ -15,19 +89,34 @@ class PersistedResponse(Response):
         headers: Optional[Mapping[str, str]] = None,
         media_type: Optional[str] = None,
         background: Optional[BackgroundTask] = None,
+        if_modified_since: Optional[str] = None,
+        range_header: Optional[str] = None,
     ) -> None:
 
         if media_type is None and self.media_type is None:
             media_type = content.content_type
 
-        mtime = email.utils.formatdate(content.last_modified, usegmt=True)
-        if headers is None:
-            headers = {'last-modified': mtime}
+        headers = _persisted_headers(content, headers)
+        headers['accept-ranges'] = 'bytes'
+
+        data = content.data
+        if _is_not_modified(content, if_modified_since):
+            status_code = 304
+            data = b''
         else:
-            headers['last-modified'] = mtime
+            try:
+                if (byte_range := _parse_range(range_header, len(data))) is not None:
+                    start, end = byte_range
+                    status_code = 206
+                    headers['content-range'] = f'bytes {start}-{end - 1}/{len(data)}'
+                    data = data[start:end]
+            except ValueError:
+                status_code = 416
+                headers['content-range'] = f'bytes */{len(data)}'
+                data = b''
 
         super().__init__(
-            content=content.data,
+            content=data,
             status_code=status_code,
             headers=headers,
             media_type=media_type,
@@ -43,16 +132,16 @@ class PersistedStatResponse(Response):
         headers: Optional[Mapping[str, str]] = None,
         media_type: Optional[str] = None,
         background: Optional[BackgroundTask] = None,
+        if_modified_since: Optional[str] = None,
     ) -> None:
         if media_type is None and self.media_type is None:
             media_type = content.content_type
 
-        mtime = email.utils.formatdate(content.last_modified, usegmt=True)
-        if headers is None:
-            headers = {'last-modified': mtime}
+        headers = _persisted_headers(content, headers)
+        if _is_not_modified(content, if_modified_since):
+            status_code = 304
         else:
-            headers['last-modified'] = mtime
-        headers['content-length'] = str(content.size)
+            headers['content-length'] = str(content.size)
 
         super().__init__(
             content=None,
@@ -62,3 +151,27 @@ class PersistedStatResponse(Response):
             background=background
         )
 
+
+@functools.lru_cache(maxsize=None)
+def _field_aliases(cls: Type[BaseModel]) -> Dict[str, str]:
+    return {name: field.alias for name, field in cls.__fields__.items() if field.alias != name}
+
+
+def _encode_model(obj: Any) -> Any:
+    # called by orjson for every model in the tree, much cheaper than model.dict()
+    if isinstance(obj, BaseModel):
+        if not (aliases := _field_aliases(type(obj))):
+            return obj.__dict__
+        return {aliases.get(k, k): v for k, v in obj.__dict__.items()}
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ViewResponse(ORJSONResponse):
+    """
+    Serializes a view model as it is. When returned from an endpoint, FastAPI 
+    skips validating it against the ``response_model`` again, which then 
+    only serves the OpenAPI docs.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_encode_model)
@@ -1,10 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from amc2_api.persistence import ObjectNotFound
 
-from ..dependencies import Databases
+from ..dependencies import Databases, get_databases
 from ..responses import PersistedResponse, PersistedStatResponse
-from ..config import settings
 
 
 class AnidbXMLResponse(PersistedResponse):
@@ -26,10 +25,10 @@ router = APIRouter(
         "404": {"description": "Anidb ID not found"}
     }
 )
-def get_show(aid: str, dbs: Databases = Depends()):
+def get_show(aid: str, request: Request, dbs: Databases = Depends(get_databases)):
     try:
         obj = dbs.anidb_animes_raw.get(f"{aid}.xml")
-        return AnidbXMLResponse(obj)
+        return AnidbXMLResponse(obj, if_modified_since=request.headers.get('if-modified-since'))
     except ObjectNotFound:
         raise HTTPException(status_code=404)
 
@@ -45,10 +44,14 @@ def get_show(aid: str, dbs: Databases = Depends()):
         "404": {"description": "Image not found"}
     }
 )
-def get_image(name: str, dbs: Databases = Depends()):
+def get_image(name: str, request: Request, dbs: Databases = Depends(get_databases)):
     try:
         obj = dbs.anidb_images.get(name)
-        return PersistedResponse(obj)
+        return PersistedResponse(
+            obj, 
+            if_modified_since=request.headers.get('if-modified-since'),
+            range_header=request.headers.get('range')
+        )
     except ObjectNotFound:
         raise HTTPException(status_code=404)
 
@@ -61,9 +64,9 @@ def get_image(name: str, dbs: Databases = Depends()):
         "404": {"description": "Image not found"}
     }
 )
-def head_image(name: str, dbs: Databases = Depends()):
+def head_image(name: str, request: Request, dbs: Databases = Depends(get_databases)):
     try:
         obj = dbs.anidb_images.stat(name)
-        return PersistedStatResponse(obj)
+        return PersistedStatResponse(obj, if_modified_since=request.headers.get('if-modified-since'))
     except ObjectNotFound:
         raise HTTPException(status_code=404)
@@ -1,13 +1,16 @@
+import concurrent.futures
+
 from fastapi import APIRouter, Depends, HTTPException
 
 from amc2_api.model import Anime, combine_anime
 from amc2_api.model import parse_anime_id, AnidbId, TmdbId, TmdbSeasonId, AnimeMappingId
 
-from ..dependencies import Databases
+from ..dependencies import Databases, get_databases
 from ..model import AnimeView, CollectionView, anime_link
-from ..config import settings
+from ..config import Settings, get_settings
+from ..responses import ViewResponse
 
-from typing import List, Optional
+from typing import List, Optional, Dict, Callable, Any
 
 
 router = APIRouter(
@@ -15,41 +18,69 @@ router = APIRouter(
     tags=["anime"],
 )
 
+# sized like the threadpool running the sync endpoints (anyio's default of 40),
+# so a mapped request never waits for the fetches of other requests,
+# the workers are only started when needed
+_fetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=40, thread_name_prefix='anime-fetch')
+
+
+def _load_anidb(dbs: Databases, anime_id: AnidbId) -> Optional[Anime]:
+    if entry := dbs.anidb_animes.get(str(anime_id.anime)):
+        return entry.anime
+    return None
+
+
+def _load_tmdb(dbs: Databases, anime_id: TmdbId) -> Optional[Anime]:
+    if entry := dbs.tmdb_animes.get(str(anime_id.show)):
+        return entry.anime
+    return None
+
+
+def _load_tmdb_season(dbs: Databases, anime_id: TmdbSeasonId) -> Optional[Anime]:
+    if entry := dbs.tmdb_animes.get(str(anime_id.tvshow)):
+        return entry.anime
+    return None
+
+
+def _load_mapping(dbs: Databases, anime_id: AnimeMappingId) -> Optional[Anime]:
+    # both may have to hit their API, fetch them side by side
+    tmdb_future = _fetch_pool.submit(dbs.tmdb_animes.get, str(anime_id.tmdb_show))
+    anidb_entry = dbs.anidb_animes.get(str(anime_id.anidb.anime))
+    tmdb_entry = tmdb_future.result()
+    if anidb_entry is None:
+        raise HTTPException(status_code=404, detail="Anidb ID not found")
+    if tmdb_entry is None:
+        raise HTTPException(status_code=404, detail="Tmdb ID not found")
+    return combine_anime(anidb_entry, tmdb_entry, anime_id.tmdb_season)
+
+
+_loaders: Dict[type, Callable[[Databases, Any], Optional[Anime]]] = {
+    AnidbId: _load_anidb,
+    TmdbId: _load_tmdb,
+    TmdbSeasonId: _load_tmdb_season,
+    AnimeMappingId: _load_mapping,
+}
+
 
 def load_anime(dbs: Databases, aid: str) -> Anime:
-    anime: Optional[Anime] = None
-
-    anime_id = parse_anime_id(aid)
-
-    if isinstance(anime_id, AnidbId):
-        if entry := dbs.anidb_animes.get(str(anime_id.anime)):
-            anime = entry.anime
-    elif isinstance(anime_id, TmdbId):
-        if entry := dbs.tmdb_animes.get(str(anime_id.show)):
-            anime = entry.anime
-    elif isinstance(anime_id, TmdbSeasonId):
-        if entry := dbs.tmdb_animes.get(str(anime_id.tvshow)):
-            anime = entry.anime
-    elif isinstance(anime_id, AnimeMappingId):
-        anidb_entry = dbs.anidb_animes.get(str(anime_id.anidb.anime))
-        tmdb_entry = dbs.tmdb_animes.get(str(anime_id.tmdb_show))
-        if anidb_entry is None:
-            raise HTTPException(status_code=404, detail="Anidb ID not found")
-        if tmdb_entry is None:
-            raise HTTPException(status_code=404, detail="Tmdb ID not found")
-        anime = combine_anime(anidb_entry, tmdb_entry, anime_id.tmdb_season)
-    else:
+    try:
+        anime_id = parse_anime_id(aid)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Invalid anime ID format")
+
+    if (loader := _loaders.get(type(anime_id))) is None:
         raise HTTPException(status_code=404, detail="Invalid anime ID format")
     
+    anime = loader(dbs, anime_id)
     if anime is None:
         raise HTTPException(status_code=404)
     return anime
 
 
 @router.get("/{anime_id}", response_model=AnimeView)
-def get_anime(anime_id: str, dbs: Databases = Depends()):
+def get_anime(anime_id: str, dbs: Databases = Depends(get_databases), settings: Settings = Depends(get_settings)):
     anime = load_anime(dbs, anime_id)
     view = AnimeView.from_model(anime, settings.self_base_url)
     view.links['anime'] = anime_link(settings.self_base_url, anime_id)
-    return view
+    return ViewResponse(view)
 
@@ -4,9 +4,10 @@ from amc2_api.model import Title
 from amc2_api.model import parse_anime_id, AnidbId, TmdbId, TmdbSeasonId, AnimeMappingId
 from amc2_api.mapping import AnimeMapping, AnidbTitleMatcher
 
-from ..dependencies import Databases
+from ..dependencies import Databases, get_databases
 from ..model import TitleMappingView, CollectionView, AnimeMappingView
-from ..config import settings
+from ..config import Settings, get_settings
+from ..responses import ViewResponse
 
 from typing import List, Optional
 
@@ -28,7 +29,8 @@ def match_id(anime_id: str) -> AnimeMappingId:
 def find_match(
     title: str, 
     db: str = 'anidb', 
-    dbs: Databases = Depends()
+    dbs: Databases = Depends(get_databases),
+    settings: Settings = Depends(get_settings)
 ) -> None:
 
     if not title:
@@ -48,30 +50,32 @@ def find_match(
     items: List[TitleMappingView] = []
     for match in matches:
         items.append(TitleMappingView.from_model(match, settings.self_base_url))
-    return CollectionView(items=items)
+    return ViewResponse(CollectionView[TitleMappingView].construct(items=items))
 
 
 @router.get("/{anime_id}", response_model=AnimeMappingView)
-def get_match(anime_id: AnimeMappingId = Depends(match_id), dbs: Databases = Depends()) -> None:
+def get_match(
+    anime_id: AnimeMappingId = Depends(match_id), 
+    dbs: Databases = Depends(get_databases), 
+    settings: Settings = Depends(get_settings)
+) -> None:
     query = AnimeMapping(anidb=str(anime_id.anidb.anime), tmdb=str(anime_id.tmdb))
     match = dbs.anime_mapping.load(query)
 
     if match is None:
         raise HTTPException(status_code=404)
-    return AnimeMappingView.from_model(match, settings.self_base_url)
+    return ViewResponse(AnimeMappingView.from_model(match, settings.self_base_url))
 
 
 @router.put("/{anime_id}")
-def store_match(anime_id: AnimeMappingId = Depends(match_id), dbs: Databases = Depends()) -> None:
+def store_match(anime_id: AnimeMappingId = Depends(match_id), dbs: Databases = Depends(get_databases)) -> None:
     query = AnimeMapping(anidb=str(anime_id.anidb.anime), tmdb=str(anime_id.tmdb))
-    if dbs.anime_mapping.load(query) is None:
-        # make put idempotent (does not trigger a useless save to disk)
-        dbs.anime_mapping.store([query], replace=True)
+    # put is idempotent (does not trigger a useless save to disk)
+    dbs.anime_mapping.upsert(query)
 
 
 @router.delete("/{anime_id}")
-def delete_match(anime_id: AnimeMappingId = Depends(match_id), dbs: Databases = Depends()) -> None:
+def delete_match(anime_id: AnimeMappingId = Depends(match_id), dbs: Databases = Depends(get_databases)) -> None:
     query = AnimeMapping(anidb=str(anime_id.anidb.anime), tmdb=str(anime_id.tmdb))
-    if dbs.anime_mapping.load(query) is not None:
-        # delete is idempotent
-        dbs.anime_mapping.remove(query)
+    # delete is idempotent
+    dbs.anime_mapping.remove_if_present(query)
@@ -1,10 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from amc2_api.persistence import ObjectNotFound
 
-from ..dependencies import Databases
+from ..dependencies import Databases, get_databases
 from ..responses import PersistedResponse, PersistedStatResponse
-from ..config import settings
 
 
 class TmdbJsonResponse(PersistedResponse):
@@ -19,12 +18,11 @@ router = APIRouter(
 
 
 @router.get("/shows/{lang}/{sid}", response_class=TmdbJsonResponse)
-def get_show(lang:str, sid: str, dbs: Databases = Depends()):
-    try:
-        obj = dbs.anidb_animes_raw.get(f"{lang}/{sid}.json")
-        return TmdbJsonResponse(obj)
-    except ObjectNotFound:
+def get_show(lang:str, sid: str, request: Request, dbs: Databases = Depends(get_databases)):
+    obj = dbs.tmdb_shows_raw.get_or_none(lang + '/' + sid + '.json')
+    if obj is None:
         raise HTTPException(status_code=404)
+    return TmdbJsonResponse(obj, if_modified_since=request.headers.get('if-modified-since'))
 
 
 @router.get(
@@ -38,10 +36,14 @@ def get_show(lang:str, sid: str, dbs: Databases = Depends()):
         "404": {"description": "Image not found"}
     }
 )
-def get_image(name: str, dbs: Databases = Depends()):
+def get_image(name: str, request: Request, dbs: Databases = Depends(get_databases)):
     try:
         obj = dbs.tmdb_images.get(name)
-        return PersistedResponse(obj)
+        return PersistedResponse(
+            obj, 
+            if_modified_since=request.headers.get('if-modified-since'),
+            range_header=request.headers.get('range')
+        )
     except ObjectNotFound:
         raise HTTPException(status_code=404)
 
@@ -54,9 +56,9 @@ def get_image(name: str, dbs: Databases = Depends()):
         "404": {"description": "Image not found"}
     }
 )
-def head_image(name: str, dbs: Databases = Depends()):
+def head_image(name: str, request: Request, dbs: Databases = Depends(get_databases)):
     try:
         obj = dbs.tmdb_images.stat(name)
-        return PersistedStatResponse(obj)
+        return PersistedStatResponse(obj, if_modified_since=request.headers.get('if-modified-since'))
     except ObjectNotFound:
         raise HTTPException(status_code=404)
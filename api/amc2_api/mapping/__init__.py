@@ -1,6 +1,6 @@
 from .model import AnimeMapping, AnimeMappingRepo, TitleMappingResult
 from .title_matching import AnidbTitleMatcher
-from .repo import SqliteAnimeMappingRepo, JsonAnimeMappingRepo, anime_mapping_repo
+from .repo import SqliteAnimeMappingRepo, DictAnimeMappingRepo, JsonAnimeMappingRepo, anime_mapping_repo
 
 __all__ = [
     'AnimeMapping', 
@@ -10,6 +10,7 @@ __all__ = [
     'AnidbTitleMatcher',
 
     'SqliteAnimeMappingRepo',
+    'DictAnimeMappingRepo',
     'JsonAnimeMappingRepo',
     'anime_mapping_repo',
 ]
\ No newline at end of file
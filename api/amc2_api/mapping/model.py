@@ -31,6 +31,10 @@ class AnimeMappingRepo(Protocol):
         """Find the Anidb IDs for any of the given IDs"""
         pass
 
+    def resolve_tmdb_many(self, anidb_ids: List[str]) -> Dict[str, List[AnimeMapping]]:
+        """Like resolve_tmdb() for many anidb IDs at once, IDs without mappings are left out"""
+        pass
+
     def load(self, query: AnimeMapping) -> Optional[AnimeMapping]:
         pass
 
@@ -40,6 +44,14 @@ class AnimeMappingRepo(Protocol):
     def remove(self, value: AnimeMapping) -> None:
         pass
 
+    def upsert(self, value: AnimeMapping) -> bool:
+        """Like store(), but only if the exact mapping is missing, returns True if stored"""
+        pass
+
+    def remove_if_present(self, value: AnimeMapping) -> bool:
+        """Removes the exact mapping, returns True if it was stored"""
+        pass
+
     def dump(self) -> List[AnimeMapping]:
         pass
 
@@ -1,15 +1,18 @@
+import atexit
+import contextlib
 import threading
 import sqlite3
 import logging
-import json
 import pathlib
 
-from amc2_api.persistence import ObjectStore, ObjectNotFound, Persisted, object_store_factory
+import orjson
+
+from amc2_api.persistence import ObjectStore, ObjectNotFound, Persisted, WriteNotSupported, object_store_factory
 from amc2_api.utils import URL
 
 from .model import AnimeMapping, AnimeMappingRepo
 
-from typing import  List, Dict, Union, Optional, Tuple, Any
+from typing import  List, Dict, Union, Optional, Tuple, Any, ContextManager, Iterator
 
 _logger = logging.getLogger(__name__)
 
@@ -30,38 +33,99 @@ def anime_mapping_repo(url: Union[str, URL]) -> AnimeMappingRepo:
 
 
 class SqliteAnimeMappingRepo:
+    """
+    A database file gets one connection per thread, so lookups run in 
+    parallel while the writes are still serialized by the lock.
+    An in-memory database only exists for its connection, thus it uses 
+    a single shared connection and lock for all threads.
+    """
+
     _lock: threading.RLock
-    _conn: sqlite3.Connection
+    _read_lock: ContextManager[Any]
+    _dbfile: str
+    _local: threading.local
+    _shared_conn: Optional[sqlite3.Connection]
 
-    _ddl = '''
+    _ddl = (
+        '''
         CREATE TABLE IF NOT EXISTS anime_mapping (
             anidb_id TEXT,
             tmdb_id TEXT,
             PRIMARY KEY (anidb_id, tmdb_id) ON CONFLICT REPLACE
         )
-    '''
+        ''',
+        # the primary key only covers lookups by anidb_id
+        'CREATE INDEX IF NOT EXISTS ix_anime_mapping_tmdb ON anime_mapping (tmdb_id)',
+    )
+
+    # fixed statement strings, so sqlite3 can reuse its cached prepared statements
+    _stmts = {
+        'select_all': 'SELECT anidb_id, tmdb_id FROM anime_mapping',
+        'select_anidb': 'SELECT anidb_id, tmdb_id FROM anime_mapping WHERE anidb_id = ?',
+        'select_tmdb': 'SELECT anidb_id, tmdb_id FROM anime_mapping WHERE tmdb_id = ?',
+        'select_one': 'SELECT anidb_id, tmdb_id FROM anime_mapping WHERE anidb_id = ? AND tmdb_id = ?',
+        'exists': 'SELECT 1 FROM anime_mapping WHERE anidb_id = ? AND tmdb_id = ?',
+        'insert': 'INSERT INTO anime_mapping (anidb_id, tmdb_id) VALUES (?, ?)',
+        'delete_any': 'DELETE FROM anime_mapping WHERE anidb_id = ? OR tmdb_id = ?',
+        'delete_anidb': 'DELETE FROM anime_mapping WHERE anidb_id = ?',
+        'delete_tmdb': 'DELETE FROM anime_mapping WHERE tmdb_id = ?',
+        'delete_one': 'DELETE FROM anime_mapping WHERE anidb_id = ? AND tmdb_id = ?',
+        'delete_all': 'DELETE FROM anime_mapping',
+    }
 
     def __init__(self, dbfile: str = ':memory:') -> None:
         self._lock = threading.RLock()
-        self._conn = sqlite3.connect(dbfile, check_same_thread=False)
-        self._conn.row_factory = sqlite3.Row
-        self._conn.execute(self._ddl)
-        self._conn.commit()
+        self._dbfile = dbfile
+        self._local = threading.local()
+
+        if dbfile == ':memory:':
+            self._shared_conn = self._connect()
+            self._read_lock = self._lock
+        else:
+            self._shared_conn = None
+            self._read_lock = contextlib.nullcontext()
+
+        with self._lock:
+            for ddl in self._ddl:
+                self._conn.execute(ddl)
+            self._conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # only the shared in-memory connection is used across threads
+        shared = self._dbfile == ':memory:'
+        conn = sqlite3.connect(self._dbfile, check_same_thread=not shared)
+        if not shared:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # wait for the writes from other processes instead of failing
+            conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-20000')
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._shared_conn is not None:
+            return self._shared_conn
+        if (conn := getattr(self._local, 'conn', None)) is None:
+            conn = self._local.conn = self._connect()
+        return conn
 
     def _query_id(self, field_name: str, field_value: str) -> List[AnimeMapping]:
-        query = f'SELECT anidb_id, tmdb_id FROM anime_mapping'
-        data: List[str] = []
+        query = self._stmts['select_all']
+        data: Tuple[str, ...] = ()
 
-        if field_name:
-            query += f' WHERE {field_name} = ?'
-            data += [field_value]
+        if field_name == 'anidb_id':
+            query, data = self._stmts['select_anidb'], (field_value,)
+        elif field_name == 'tmdb_id':
+            query, data = self._stmts['select_tmdb'], (field_value,)
+        elif field_name:
+            raise ValueError(f"Unknown field '{field_name}'")
 
-        result: List[AnimeMapping] = []
-        with self._lock:
-            for row in self._conn.execute(query, tuple(data)):
-                m = AnimeMapping(anidb=str(row['anidb_id']), tmdb=str(row['tmdb_id']))
-                result.append(m)
-        return result
+        # plain tuple rows: all selects return (anidb_id, tmdb_id)
+        with self._read_lock:
+            rows = self._conn.execute(query, data).fetchall()
+        return [AnimeMapping(anidb, tmdb) for anidb, tmdb in rows]
 
     def resolve_tmdb(self, query: AnimeMapping) -> List[AnimeMapping]:
         if not query.anidb:
@@ -73,23 +137,33 @@ class SqliteAnimeMappingRepo:
             raise ValueError("Expected tmdb id to be set")
         return self._query_id('tmdb_id', query.tmdb)
 
+    def resolve_tmdb_many(self, anidb_ids: List[str]) -> Dict[str, List[AnimeMapping]]:
+        result: Dict[str, List[AnimeMapping]] = {}
+        
+        # stay below the SQLITE_MAX_VARIABLE_NUMBER of older sqlite versions
+        chunk_size = 500
+        for i in range(0, len(anidb_ids), chunk_size):
+            chunk = anidb_ids[i:i+chunk_size]
+            query = 'SELECT anidb_id, tmdb_id FROM anime_mapping'
+            query += f' WHERE anidb_id IN ({", ".join("?" * len(chunk))})'
+
+            with self._read_lock:
+                rows = self._conn.execute(query, tuple(chunk)).fetchall()
+            for anidb, tmdb in rows:
+                result.setdefault(anidb, []).append(AnimeMapping(anidb, tmdb))
+        return result
+
     def load(self, query: AnimeMapping) -> Optional[AnimeMapping]:
         if not query.tmdb or not query.anidb:
             raise ValueError("Expected tmdb and anidb ids to be set")
 
-        sql_query  = f'SELECT anidb_id, tmdb_id FROM anime_mapping'
-        sql_query += f' WHERE anidb_id = ? AND tmdb_id = ?'
-
-        with self._lock:
-            row = self._conn.execute(sql_query, (query.anidb, query.tmdb)).fetchone()
+        with self._read_lock:
+            row = self._conn.execute(self._stmts['select_one'], (query.anidb, query.tmdb)).fetchone()
             if row:
-                return AnimeMapping(anidb=str(row['anidb_id']), tmdb=str(row['tmdb_id']))
+                return AnimeMapping(*row)
         return None
 
     def store(self, values: List[AnimeMapping], replace: bool = True) -> None:
-        query_ins = 'INSERT INTO anime_mapping (anidb_id, tmdb_id) VALUES (?, ?)'
-        query_del = 'DELETE FROM anime_mapping WHERE anidb_id = ? OR tmdb_id = ?'
-
         data: List[Tuple[str, str]] = []
         for value in values:
             if not value.tmdb or not value.anidb:
@@ -98,34 +172,74 @@ class SqliteAnimeMappingRepo:
 
         with self._lock:
             try:
+                # one write transaction (and one commit) for the whole batch
+                self._conn.execute('BEGIN IMMEDIATE')
                 if replace:
-                    self._conn.executemany(query_del, data)
-                self._conn.executemany(query_ins, data)
+                    self._delete_any_many(data)
+                self._conn.executemany(self._stmts['insert'], data)
                 self._conn.commit()
             except Exception:
                 self._conn.rollback()
                 raise
 
+    def _delete_any_many(self, data: List[Tuple[str, str]]) -> None:
+        # one statement per chunk instead of one per row, 
+        # two parameters per row below the SQLITE_MAX_VARIABLE_NUMBER of older sqlite versions
+        chunk_size = 400
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i+chunk_size]
+            marks = ", ".join("?" * len(chunk))
+            query = f'DELETE FROM anime_mapping WHERE anidb_id IN ({marks}) OR tmdb_id IN ({marks})'
+            self._conn.execute(query, tuple(a for a, _ in chunk) + tuple(t for _, t in chunk))
+
     def remove(self, value: AnimeMapping) -> None:
-        data: Dict[str, str] = {}
-        if value.tmdb:
-            data['tmdb_id'] = value.tmdb
-        if value.anidb:
-            data['anidb_id'] = value.anidb
-
-        if not data:
-            return []
-        
-        query = 'DELETE FROM anime_mapping WHERE '
-        query += 'AND'.join([f' {k} = ? ' for k in data.keys()])
+        if value.anidb and value.tmdb:
+            query, data = self._stmts['delete_one'], (value.anidb, value.tmdb)
+        elif value.anidb:
+            query, data = self._stmts['delete_anidb'], (value.anidb,)
+        elif value.tmdb:
+            query, data = self._stmts['delete_tmdb'], (value.tmdb,)
+        else:
+            return
+
+        with self._lock:
+            try:
+                self._conn.execute(query, data)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def upsert(self, value: AnimeMapping) -> bool:
+        if not value.tmdb or not value.anidb:
+            raise ValueError("Expected tmdb and anidb id to be set")
+
+        data = (value.anidb, value.tmdb)
+
+        with self._lock:
+            if self._conn.execute(self._stmts['exists'], data).fetchone() is not None:
+                return False
+            try:
+                self._conn.execute(self._stmts['delete_any'], data)
+                self._conn.execute(self._stmts['insert'], data)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return True
+
+    def remove_if_present(self, value: AnimeMapping) -> bool:
+        if not value.tmdb or not value.anidb:
+            raise ValueError("Expected tmdb and anidb id to be set")
 
         with self._lock:
             try:
-                self._conn.execute(query, tuple(data.values()))
+                cursor = self._conn.execute(self._stmts['delete_one'], (value.anidb, value.tmdb))
                 self._conn.commit()
             except Exception:
                 self._conn.rollback()
                 raise
+        return cursor.rowcount > 0
 
     def dump(self) -> List[AnimeMapping]:
         return self._query_id('', '')
@@ -133,13 +247,167 @@ class SqliteAnimeMappingRepo:
     def purge(self) -> None:
         with self._lock:
             try:
-                self._conn.execute('DELETE FROM anime_mapping')
+                self._conn.execute(self._stmts['delete_all'])
                 self._conn.commit()
             except Exception:
                 self._conn.rollback()
                 raise
 
 
+_Index = Dict[str, Dict[str, None]]
+
+
+class _DictMappings:
+    """
+    A writable copy of the mappings of a DictAnimeMappingRepo. 
+    The outer dicts are copied upfront, the inner ones only when changed,
+    thus the published snapshot is never modified.
+    """
+
+    # ordered dicts used as sets, they keep the insertion order like the sqlite rowid
+    rows: Dict[Tuple[str, str], None]
+    by_anidb: _Index
+    by_tmdb: _Index
+
+    def __init__(self, rows: Dict[Tuple[str, str], None], by_anidb: _Index, by_tmdb: _Index) -> None:
+        self.rows = dict(rows)
+        self.by_anidb = dict(by_anidb)
+        self.by_tmdb = dict(by_tmdb)
+
+    def add(self, anidb: str, tmdb: str) -> None:
+        self.rows[(anidb, tmdb)] = None
+        self.by_anidb[anidb] = {**self.by_anidb.get(anidb, {}), tmdb: None}
+        self.by_tmdb[tmdb] = {**self.by_tmdb.get(tmdb, {}), anidb: None}
+
+    def _discard_from(self, index: _Index, key: str, value: str) -> None:
+        if (others := {k: None for k in index[key] if k != value}):
+            index[key] = others
+        else:
+            del index[key]
+
+    def discard(self, anidb: str, tmdb: str) -> bool:
+        if self.rows.pop((anidb, tmdb), False) is False:
+            return False
+        self._discard_from(self.by_anidb, anidb, tmdb)
+        self._discard_from(self.by_tmdb, tmdb, anidb)
+        return True
+
+    def discard_anidb(self, anidb: str) -> None:
+        for tmdb in list(self.by_anidb.get(anidb, ())):
+            self.discard(anidb, tmdb)
+
+    def discard_tmdb(self, tmdb: str) -> None:
+        for anidb in list(self.by_tmdb.get(tmdb, ())):
+            self.discard(anidb, tmdb)
+
+
+class DictAnimeMappingRepo:
+    """
+    Keeps the mappings in plain dicts indexed by both IDs.
+    Lookups are a hash lookup instead of a query, 
+    meant as cache for a repo that is seldomly written.
+
+    Readers use the current snapshot without locking. Writers change a copy 
+    and publish it by rebinding the attribute, which is atomic.
+    """
+
+    _snapshot: Tuple[Dict[Tuple[str, str], None], _Index, _Index]
+    _lock: threading.RLock
+
+    def __init__(self) -> None:
+        self._snapshot = ({}, {}, {})
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def _write(self) -> Iterator[_DictMappings]:
+        with self._lock:
+            mappings = _DictMappings(*self._snapshot)
+            yield mappings
+            self._snapshot = (mappings.rows, mappings.by_anidb, mappings.by_tmdb)
+
+    def resolve_tmdb(self, query: AnimeMapping) -> List[AnimeMapping]:
+        if not query.anidb:
+            raise ValueError("Expected anidb id to be set")
+        by_anidb = self._snapshot[1]
+        return [AnimeMapping(anidb=query.anidb, tmdb=t) for t in by_anidb.get(query.anidb, ())]
+
+    def resolve_anidb(self, query: AnimeMapping) -> List[AnimeMapping]:
+        if not query.tmdb:
+            raise ValueError("Expected tmdb id to be set")
+        by_tmdb = self._snapshot[2]
+        return [AnimeMapping(anidb=a, tmdb=query.tmdb) for a in by_tmdb.get(query.tmdb, ())]
+
+    def resolve_tmdb_many(self, anidb_ids: List[str]) -> Dict[str, List[AnimeMapping]]:
+        by_anidb = self._snapshot[1]
+        result: Dict[str, List[AnimeMapping]] = {}
+        for anidb in anidb_ids:
+            if (tmdb_ids := by_anidb.get(anidb)) is not None:
+                result[anidb] = [AnimeMapping(anidb=anidb, tmdb=t) for t in tmdb_ids]
+        return result
+
+    def load(self, query: AnimeMapping) -> Optional[AnimeMapping]:
+        if not query.tmdb or not query.anidb:
+            raise ValueError("Expected tmdb and anidb ids to be set")
+        if (query.anidb, query.tmdb) in self._snapshot[0]:
+            return AnimeMapping(anidb=query.anidb, tmdb=query.tmdb)
+        return None
+
+    def store(self, values: List[AnimeMapping], replace: bool = True) -> None:
+        for value in values:
+            if not value.tmdb or not value.anidb:
+                raise ValueError("Expected tmdb and anidb id to be set")
+
+        with self._write() as mappings:
+            if replace:
+                for value in values:
+                    mappings.discard_anidb(value.anidb)
+                    mappings.discard_tmdb(value.tmdb)
+            for value in values:
+                # a stored row is replaced, thus moves to the end
+                mappings.discard(value.anidb, value.tmdb)
+                mappings.add(value.anidb, value.tmdb)
+
+    def remove(self, value: AnimeMapping) -> None:
+        with self._write() as mappings:
+            if value.anidb and value.tmdb:
+                mappings.discard(value.anidb, value.tmdb)
+            elif value.anidb:
+                mappings.discard_anidb(value.anidb)
+            elif value.tmdb:
+                mappings.discard_tmdb(value.tmdb)
+
+    def upsert(self, value: AnimeMapping) -> bool:
+        if not value.tmdb or not value.anidb:
+            raise ValueError("Expected tmdb and anidb id to be set")
+
+        with self._lock:
+            if (value.anidb, value.tmdb) in self._snapshot[0]:
+                return False
+            with self._write() as mappings:
+                mappings.discard_anidb(value.anidb)
+                mappings.discard_tmdb(value.tmdb)
+                mappings.add(value.anidb, value.tmdb)
+        return True
+
+    def remove_if_present(self, value: AnimeMapping) -> bool:
+        if not value.tmdb or not value.anidb:
+            raise ValueError("Expected tmdb and anidb id to be set")
+
+        with self._lock:
+            if (value.anidb, value.tmdb) not in self._snapshot[0]:
+                return False
+            with self._write() as mappings:
+                mappings.discard(value.anidb, value.tmdb)
+        return True
+
+    def dump(self) -> List[AnimeMapping]:
+        return [AnimeMapping(anidb=a, tmdb=t) for a, t in self._snapshot[0]]
+
+    def purge(self) -> None:
+        with self._lock:
+            self._snapshot = ({}, {}, {})
+
+
 class JsonAnimeMappingRepo:
     """
     A mappings repo that uses a simple json document stored on objectstore.
@@ -148,27 +416,52 @@ class JsonAnimeMappingRepo:
     Useful for example to keep everything on the S3 store to make backups easier.
 
     The file is loaded/dumped as a whole when first loaded or when updated.
-    Normal read access uses a cache that is kept in sync. 
+    Normal read access uses a cache that is kept in sync, without locking. 
     Modification of the backing file from outside is not supported.
+
+    Updates are written behind: the file is dumped ``flush_delay`` seconds 
+    after the first unsaved change, so a burst of changes is uploaded once.
+    Pending changes are also written by flush() and on interpreter exit.
+    Changes that cancel out (e.g. a match that was stored and forgotten again)
+    do not cause an upload.
+
+    Until the backend accepted a first upload the changes are written right 
+    away, so e.g. WriteNotSupported of a read-only backend reaches the caller.
+    A failed write behind is logged and retried, waiting twice as long each 
+    time, up to ``max_flush_delay`` seconds.
     """
 
+    max_flush_delay: float = 300
+
     filename: str
     cache: AnimeMappingRepo
     backend: ObjectStore
+    flush_delay: float
     _loaded: bool
+    _dirty: bool
+    _saved: Optional[bytes]
+    _backend_writable: bool
+    _timer: Optional[threading.Timer]
     _lock: threading.RLock
 
     def __init__(
         self, 
         filename: str,
         backend: ObjectStore, 
-        cache: Optional[AnimeMappingRepo] = None
+        cache: Optional[AnimeMappingRepo] = None,
+        flush_delay: float = 1.0
     ) -> None:
         self.filename = filename
         self.backend = backend
-        self.cache = cache if cache else SqliteAnimeMappingRepo()
+        self.cache = cache if cache else DictAnimeMappingRepo()
+        self.flush_delay = flush_delay
         self._loaded = False
+        self._dirty = False
+        self._saved = None
+        self._backend_writable = False
+        self._timer = None
         self._lock = threading.RLock()
+        atexit.register(self._flush_at_exit)
         
     def _load(self) -> None:
         if self._loaded:
@@ -176,42 +469,85 @@ class JsonAnimeMappingRepo:
 
         self.cache.purge()
         try:
-            data = self.backend.get(self.filename).data.decode()
+            data = self.backend.get(self.filename).data
             if data:
-                items = [self._from_json(x) for x in json.loads(data)]
+                # positional arguments, this is the whole file in one loop
+                items = [AnimeMapping(str(x['anidb']), str(x['tmdb'])) for x in orjson.loads(data)]
                 self.cache.store(items, replace=False)
-        except (UnicodeDecodeError, json.JSONDecodeError, ValueError) as e:
+            self._saved = data
+        except (UnicodeDecodeError, orjson.JSONDecodeError, ValueError, KeyError, TypeError) as e:
             _logger.error("Failed to decode anime mapping repo json data: " + str(e))
         except ObjectNotFound:
             pass
         self._loaded = True
 
-    def _save(self) -> None:
-        json_data = [self._to_json(item) for item in self.cache.dump()]
-        json_str = json.dumps(json_data, indent=4)
-        obj = Persisted(content_type='text/json', data=json_str.encode())
-        self.backend.put(self.filename, obj)
+    def _loaded_cache(self) -> AnimeMappingRepo:
+        # the cache is thread safe on its own, readers only need the lock for the first load
+        if not self._loaded:
+            with self._lock:
+                self._load()
+        return self.cache
 
-    def _to_json(self, value: AnimeMapping) -> Any:
-        return {'anidb': value.anidb, 'tmdb': value.tmdb}
+    def _save(self) -> None:
+        self._dirty = True
+        if self.flush_delay <= 0 or not self._backend_writable:
+            self.flush()
+        else:
+            self._flush_later(self.flush_delay)
+
+    def _flush_later(self, delay: float) -> None:
+        # called holding the lock
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._flush_behind, args=(delay,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            _logger.error("Failed to write the anime mappings on exit: " + str(e))
 
-    def _from_json(self, value: Any) -> AnimeMapping:
-        return AnimeMapping(anidb=str(value['anidb']), tmdb=str(value['tmdb']))
+    def _flush_behind(self, delay: float) -> None:
+        try:
+            self.flush()
+        except WriteNotSupported as e:
+            # retrying won't help, the changes are kept in the cache only
+            _logger.error("Failed to write the anime mappings: " + str(e))
+        except Exception as e:
+            delay = min(delay * 2, self.max_flush_delay)
+            _logger.error(f"Failed to write the anime mappings, retrying in {delay}s: " + str(e))
+            with self._lock:
+                self._flush_later(delay)
+
+    def flush(self) -> None:
+        """Writes the pending changes to the backend now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+
+            # orjson serializes the AnimeMapping dataclasses as they are
+            data = orjson.dumps(self.cache.dump())
+            if data != self._saved:
+                self.backend.put(self.filename, Persisted(content_type='text/json', data=data))
+                self._saved = data
+                self._backend_writable = True
+            self._dirty = False
 
     def resolve_tmdb(self, query: AnimeMapping) -> List[AnimeMapping]:
-        with self._lock:
-            self._load()
-            return self.cache.resolve_tmdb(query)
+        return self._loaded_cache().resolve_tmdb(query)
 
     def resolve_anidb(self, query: AnimeMapping) -> List[AnimeMapping]:
-        with self._lock:
-            self._load()
-            return self.cache.resolve_anidb(query)
+        return self._loaded_cache().resolve_anidb(query)
+
+    def resolve_tmdb_many(self, anidb_ids: List[str]) -> Dict[str, List[AnimeMapping]]:
+        return self._loaded_cache().resolve_tmdb_many(anidb_ids)
 
     def load(self, query: AnimeMapping) -> Optional[AnimeMapping]:
-        with self._lock:
-            self._load()
-            return self.cache.load(query)
+        return self._loaded_cache().load(query)
 
     def store(self, values: List[AnimeMapping], replace: bool = True) -> None:
         with self._lock:
@@ -225,10 +561,23 @@ class JsonAnimeMappingRepo:
             self.cache.remove(value)
             self._save()
 
-    def dump(self) -> List[AnimeMapping]:
+    def upsert(self, value: AnimeMapping) -> bool:
+        with self._lock:
+            self._load()
+            # the whole file is written, skip it when nothing changed
+            if changed := self.cache.upsert(value):
+                self._save()
+            return changed
+
+    def remove_if_present(self, value: AnimeMapping) -> bool:
         with self._lock:
             self._load()
-            return self.cache.dump()
+            if changed := self.cache.remove_if_present(value):
+                self._save()
+            return changed
+
+    def dump(self) -> List[AnimeMapping]:
+        return self._loaded_cache().dump()
 
     def purge(self) -> None:
         with self._lock:
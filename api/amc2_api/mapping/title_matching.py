@@ -1,5 +1,3 @@
-import itertools
-
 from amc2_api.model import Title, TitleEntry, TitleRepo
 
 from typing import  List, Dict, Union, Optional
@@ -54,13 +52,17 @@ class AnidbTitleMatcher:
 
         anidb_titles = self._anidb_repo.find(title)
         anidb_titles_idx = self._index_titles(anidb_titles)
+        if not anidb_titles_idx:
+            return []
 
         result: List[TitleMappingResult] = []
 
         # eliminate titles where we have a persisted mapping
-        for titles in anidb_titles_idx.values():
-            main_title = self._get_main_title(titles)
-            result += self._find_stored_match(main_title)
+        stored = self._mapping_repo.resolve_tmdb_many(list(anidb_titles_idx.keys()))
+        for aid, titles in anidb_titles_idx.items():
+            if (mappings := stored.get(aid)):
+                main_title = self._get_main_title(titles)
+                result += self._find_stored_match(main_title, mappings)
 
         # dont match stored mappings again
         for item in result:
@@ -70,11 +72,12 @@ class AnidbTitleMatcher:
         if not anidb_titles_idx:
             return result
 
+        # the search only found the titles matching the value, get all of them at once
+        titles_by_aid = self._anidb_repo.find_by_aids(list(anidb_titles_idx.keys()))
+
         # try to match one anime after another
         for anidb_id in anidb_titles_idx.keys():
-            anidb_titles = self._anidb_repo.find(Title(aid=anidb_id))
-
-            result += self._find_tmdb_match(anidb_titles, lang)
+            result += self._find_tmdb_match(titles_by_aid.get(anidb_id, []), lang)
         
         return result
     
@@ -89,12 +92,11 @@ class AnidbTitleMatcher:
         sec = sec if isinstance(sec, Title) else sec.title
         return TitleMappingResult(anidb=pri, tmdb=sec, is_from_match=match, is_from_storage=load)
 
-    def _find_stored_match(self, entry: TitleEntry) -> List[TitleMappingResult]:
+    def _find_stored_match(self, entry: TitleEntry, mappings: List[AnimeMapping]) -> List[TitleMappingResult]:
         res: List[TitleMappingResult] = []
 
-        query = AnimeMapping(anidb=entry.title.aid)
-        for id_tuple in self._mapping_repo.resolve_tmdb(query):
-            result = self._result(entry, Title(aid=id_tuple.tmdb), load=True)
+        for id_tuple in mappings:
+            result = self._result(entry, Title.trusted('', id_tuple.tmdb, '', ''), load=True)
             res.append(result)
         
         return res
@@ -113,7 +115,7 @@ class AnidbTitleMatcher:
         # anidb/romaji/func_param -> anidb/english/repo_find -> tmdb/english/match
         
         for anidb_title in self._get_mapping_titles(anidb_titles):
-            tmdb_query = Title(lang=lang, value=anidb_title.title.value)
+            tmdb_query = Title.trusted(anidb_title.title.value, '', lang, '')
             tmdb_titles = self._tmdb_repo.find(tmdb_query)
 
             perfect_match = self._find_perfect_title_match(anidb_titles, tmdb_titles)
@@ -136,39 +138,44 @@ class AnidbTitleMatcher:
         anidb_titles: List[TitleEntry], 
         tmdb_titles: List[TitleEntry]
     ) -> Optional[TitleMappingResult]:
-        # search in the cartesian product and abort early if found
+        # first match in the order of the cartesian product, but with a lookup 
+        # instead of comparing all pairs
         # expects the titles to be from the same show (other matches/shows are lost)
-        for anidb_title, tmdb_title in itertools.product(anidb_titles, tmdb_titles):
-            # note: keep it strict, anime sequels often have a 1-character difference
-            t1 = anidb_title.title.value.strip().lower()
-            t2 = tmdb_title.title.value.strip().lower()
-            if t1 == t2 and t1 != '':
+        # note: keep it strict, anime sequels often have a 1-character difference
+        tmdb_by_value: Dict[str, TitleEntry] = {}
+        for tmdb_title in tmdb_titles:
+            tmdb_by_value.setdefault(tmdb_title.title.value.strip().lower(), tmdb_title)
+        tmdb_by_value.pop('', None)
+
+        for anidb_title in anidb_titles:
+            if (tmdb_title := tmdb_by_value.get(anidb_title.title.value.strip().lower())) is not None:
                 return self._result(anidb_title, tmdb_title, match=True)
         return None
 
     def _index_titles(self, titles: List[TitleEntry]) -> Dict[str, List[TitleEntry]]:
         entry_map: Dict[str, List[TitleEntry]] = {}
         for entry in titles:
-            if entry.title.aid not in entry_map:
-                entry_map[entry.title.aid] = []
-            entry_map[entry.title.aid].append(entry)
+            entry_map.setdefault(entry.title.aid, []).append(entry)
         return entry_map
 
     def _get_main_title(self, titles: List[TitleEntry]) -> TitleEntry:
-        # prefer the main title
+        # in order of preference: the main title, maybe an english official title, 
+        # there must be an official japanese title, right? 
+        official_en: Optional[TitleEntry] = None
+        official_ja: Optional[TitleEntry] = None
         for entry in titles:
             if entry.title.type == 'main':
                 return entry
-
-        # maybe there is an english official title    
-        for entry in titles:
-            if entry.title.type == 'official' and entry.title.lang == 'en':
-                return entry
-
-        # there must be an official japanese title, right?
-        for entry in titles:
-            if entry.title.type == 'official' and entry.title.lang == 'ja':
-                return entry
+            elif entry.title.type == 'official':
+                if entry.title.lang == 'en' and official_en is None:
+                    official_en = entry
+                elif entry.title.lang == 'ja' and official_ja is None:
+                    official_ja = entry
+
+        if official_en is not None:
+            return official_en
+        if official_ja is not None:
+            return official_ja
         
         # return the first title
         if titles:
@@ -180,8 +187,15 @@ class AnidbTitleMatcher:
 
     def _get_mapping_titles(self, titles: List[TitleEntry]) -> List[TitleEntry]:
         # the list of titles to try to map, in order
-        r  = [t for t in titles if t.title.type == 'official' and t.title.lang == 'en']
-        r += [t for t in titles if t.title.type == 'main']
-        r += [t for t in titles if t.title.type == 'official' and t.title.lang == 'ja']
-        return r
-        
+        official_en: List[TitleEntry] = []
+        main: List[TitleEntry] = []
+        official_ja: List[TitleEntry] = []
+        for t in titles:
+            if t.title.type == 'main':
+                main.append(t)
+            elif t.title.type == 'official':
+                if t.title.lang == 'en':
+                    official_en.append(t)
+                elif t.title.lang == 'ja':
+                    official_ja.append(t)
+        return official_en + main + official_ja
@@ -1,13 +1,21 @@
+import collections
 import datetime
 import enum
-import copy
+import threading
+import time
 import dataclasses
 import re
 
 from pydantic import BaseModel, validator
 
 
-from typing import List, Optional, Protocol, Union, Optional, Dict, Tuple
+from typing import List, Optional, Protocol, Union, Optional, Dict, Tuple, Sequence, Any, Type, TypeVar
+
+
+_RE_TMDB_SEASON = re.compile(r'^T([0-9]+)S([0-9]+)$')
+_RE_TMDB_OR_SEASON = re.compile(r'^T([0-9]+)(?:S[0-9]+)?$', re.I)
+# groups: anidb, mapped tmdb show, mapped tmdb season, tmdb show, tmdb season
+_RE_ANIME_ID = re.compile(r'^(?:A([0-9]+)(?:-T([0-9]+)S([0-9]+))?|T([0-9]+)(?:S([0-9]+))?)$')
 
 
 @dataclasses.dataclass(frozen=True)
@@ -25,7 +33,7 @@ class TmdbSeasonId:
             tvshow = value[0]
             season = value[1]
         elif isinstance(value, str):
-            if (m := re.match(r'^T([0-9]+)S([0-9]+)$', value)) is not None:
+            if (m := _RE_TMDB_SEASON.match(value)) is not None:
                 tvshow = int(m.group(1))
                 season = int(m.group(2))
             else:
@@ -37,7 +45,12 @@ class TmdbSeasonId:
         super().__setattr__('season', season)
     
     def __str__(self) -> str:
-        return f"T{self.tvshow}S{self.season}"
+        return TmdbSeasonId.format(self.tvshow, self.season)
+
+    @staticmethod
+    def format(tvshow: int, season: int) -> str:
+        """Same as ``str(TmdbSeasonId((tvshow, season)))``, without building the id"""
+        return f"T{tvshow}S{season}"
 
 
 @dataclasses.dataclass(frozen=True)
@@ -83,7 +96,7 @@ class TmdbId:
                 raise ValueError("Invalid TmdbId, string must not be empty")
             elif value.isdecimal():
                 show = int(value)
-            elif (m := re.match(r'^T([0-9]+)(?:S[0-9]+)?$', value, re.I)):
+            elif (m := _RE_TMDB_OR_SEASON.match(value)):
                 show = int(m.group(1))
             else:
                 raise ValueError("Invalid TmdbId, string must be decimal")
@@ -129,20 +142,30 @@ class AnimeMappingId:
         return f"{self.anidb}-{self.tmdb}"
 
 
+def _make_id(cls: type, **fields: object) -> Any:
+    # skips the validation in __init__, for values that are known to be valid
+    obj = object.__new__(cls)
+    for name, value in fields.items():
+        object.__setattr__(obj, name, value)
+    return obj
+
+
 def parse_anime_id(value: str) -> Union[AnidbId, TmdbId, TmdbSeasonId, AnimeMappingId]:
-    if (m := re.match(r'^A[0-9]+$', value)):
-        return AnidbId(value)
-    elif (m := re.match(r'^T[0-9]+$', value)):
-        return TmdbId(value)
-    elif (m := re.match(r'^T[0-9]+S[0-9]+$', value)):
-        return TmdbSeasonId(value)
-    elif (m := re.match(r'^A([0-9]+)-T([0-9]+)S([0-9]+)$', value)):
-        anidb = AnidbId(int(m.group(1)))
-        tmdb = TmdbSeasonId((int(m.group(2)), int(m.group(3))))
-        return AnimeMappingId(anidb=anidb, tmdb=tmdb)
-    else:
+    if not value or value[0] not in 'AT' or (m := _RE_ANIME_ID.match(value)) is None:
         raise ValueError("Invalid anime id")
 
+    anidb, mapped_show, mapped_season, show, season = m.groups()
+    if anidb is not None:
+        anidb_id: AnidbId = _make_id(AnidbId, anime=int(anidb))
+        if mapped_show is None:
+            return anidb_id
+        tmdb_id = _make_id(TmdbSeasonId, tvshow=int(mapped_show), season=int(mapped_season))
+        return AnimeMappingId(anidb=anidb_id, tmdb=tmdb_id)
+    elif season is None:
+        return _make_id(TmdbId, show=int(show))
+    else:
+        return _make_id(TmdbSeasonId, tvshow=int(show), season=int(season))
+
 
 class ImageType(enum.Enum):
     # the printout in movie theaters or on the DVD box
@@ -157,12 +180,32 @@ class ImageType(enum.Enum):
     unknown: 'unknown'
 
 
+M = TypeVar('M', bound=BaseModel)
+
+
+def _construct_trusted(cls: Type[M], values: Dict[str, Any]) -> M:
+    # like BaseModel.construct(), but for a complete set of already valid
+    # values: skips the validation and the per-field default lookup
+    obj = cls.__new__(cls)
+    object.__setattr__(obj, '__dict__', values)
+    object.__setattr__(obj, '__fields_set__', set(values))
+    return obj
+
+
 class Image(BaseModel):
     source: str
     name: str
     type: ImageType
     # TODO: optional width, height, aspect
 
+    class Config:
+        frozen = True
+
+    @classmethod
+    def trusted(cls, source: str, name: str, type: ImageType) -> 'Image':
+        """Build an image without validation, for the images of parsed API responses."""
+        return _construct_trusted(cls, {'source': source, 'name': name, 'type': type})
+
 
 class Title(BaseModel):
     value: str = ''
@@ -170,11 +213,21 @@ class Title(BaseModel):
     lang: str = ''
     type: str = ''
 
+    @classmethod
+    def trusted(cls, value: str, aid: str, lang: str, type: str) -> 'Title':
+        """Build a title without validation, for bulk loads of the titles dump."""
+        return _construct_trusted(cls, {'value': value, 'aid': aid, 'lang': lang, 'type': type})
+
 
 class TitleEntry(BaseModel):
     title: Title
     age: Optional[datetime.datetime] = None
 
+    @classmethod
+    def trusted(cls, title: Title, age: Optional[datetime.datetime]) -> 'TitleEntry':
+        """Build an entry without validation, this also skips copying the title."""
+        return _construct_trusted(cls, {'title': title, 'age': age})
+
 
 class TitleRepo(Protocol):
 
@@ -182,8 +235,19 @@ class TitleRepo(Protocol):
         # note: an emty field in the requested Title means no restriction.
         raise NotImplementedError()
     
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        # like find(), but only checks for a match with a type not in exclude_types
+        raise NotImplementedError()
+
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        # all titles of each of the given animes, animes without titles are left out
+        raise NotImplementedError()
+    
     def store(self, title: TitleEntry) -> None:
         raise NotImplementedError()
+
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        raise NotImplementedError()
     
     def purge(self) -> None:
         raise NotImplementedError()
@@ -205,12 +269,18 @@ class Credit(BaseModel):
     department: str = ''
     category: str = ''
 
+    class Config:
+        frozen = True
+
 
 class Rating(BaseModel):
     source: str
     average: float
     votes: int = 0
 
+    class Config:
+        frozen = True
+
 
 class Episode(BaseModel):
     number: int
@@ -297,6 +367,66 @@ class AnimeRepo(Protocol):
         raise NotImplementedError()
 
 
+class CachedAnimeRepo:
+    """
+    Keeps the parsed anime of another repo in memory for ``ttl`` seconds, 
+    at most ``maxsize`` of them (the least recently used are dropped first).
+    Concurrent requests for the same missing anime only load it once.
+
+    The cached entries are shared between the callers, they must not be modified.
+    """
+
+    _repo: AnimeRepo
+    _ttl: float
+    _maxsize: int
+    _entries: 'collections.OrderedDict[str, Tuple[float, AnimeEntry]]'
+    _loading: Dict[str, threading.Lock]
+    _lock: threading.Lock
+
+    def __init__(self, repo: AnimeRepo, ttl: float, maxsize: int = 256) -> None:
+        self._repo = repo
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, aid: str) -> Optional[AnimeEntry]:
+        # expects self._lock to be held
+        item = self._entries.get(aid)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            del self._entries[aid]
+            return None
+        self._entries.move_to_end(aid)
+        return item[1]
+
+    def get(self, aid: str) -> Optional[AnimeEntry]:
+        with self._lock:
+            if (entry := self._lookup(aid)) is not None:
+                return entry
+            load_lock = self._loading.setdefault(aid, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # loaded by another thread while waiting for the lock
+                if (entry := self._lookup(aid)) is not None:
+                    return entry
+            
+            entry = None
+            try:
+                entry = self._repo.get(aid)
+            finally:
+                with self._lock:
+                    if entry is not None:
+                        self._entries[aid] = (time.monotonic() + self._ttl, entry)
+                        while len(self._entries) > self._maxsize:
+                            self._entries.popitem(last=False)
+                    self._loading.pop(aid, None)
+        return entry
+
+
 def combine_anime(
     anidb_anime: Union[Anime, AnimeEntry],
     tmdb_anime: Union[Anime, AnimeEntry],
@@ -313,25 +443,25 @@ def combine_anime(
     anidb_id = AnidbId(anidb_anime.id)
     tmdb_id = TmdbSeasonId((TmdbId(tmdb_anime.id).show, tmdb_season))
 
-    anime = copy.deepcopy(anidb_anime)
-    anime.id = str(AnimeMappingId(anidb=anidb_id, tmdb=tmdb_id))
-    anime.uniqueids.update(tmdb_anime.uniqueids)
-    anime.images += copy.deepcopy(tmdb_anime.images)
-    anime.ratings += copy.deepcopy(tmdb_anime.ratings)
-
-    # anidb does not have genres
-    anime.genres = copy.deepcopy(tmdb_anime.genres)
-
+    # copy only what gets changed, the parsed animes may be shared by a cache
     season_map: List[Tuple[int, int]] = [(0, 0), (1, tmdb_season)]
     new_seasons: List[Season] = []
 
     for anidb_sid, tmdb_sid in season_map:
-        anidb_s = anime.find_season_by_number(anidb_sid)
+        anidb_s = anidb_anime.find_season_by_number(anidb_sid)
         tmdb_s = tmdb_anime.find_season_by_number(tmdb_sid)
         if anidb_s is not None and tmdb_s is not None:
-            anidb_s.images += copy.deepcopy(tmdb_s.images)
-            anidb_s.ratings += copy.deepcopy(tmdb_s.ratings)
-            new_seasons.append(anidb_s)
-    anime.seasons = new_seasons
-
-    return anime
+            new_seasons.append(anidb_s.copy(update={
+                'images': anidb_s.images + tmdb_s.images,
+                'ratings': anidb_s.ratings + tmdb_s.ratings,
+            }))
+
+    return anidb_anime.copy(update={
+        'id': str(AnimeMappingId(anidb=anidb_id, tmdb=tmdb_id)),
+        'uniqueids': {**anidb_anime.uniqueids, **tmdb_anime.uniqueids},
+        'images': anidb_anime.images + tmdb_anime.images,
+        'ratings': anidb_anime.ratings + tmdb_anime.ratings,
+        # anidb does not have genres
+        'genres': list(tmdb_anime.genres),
+        'seasons': new_seasons,
+    })
@@ -1,9 +1,12 @@
+import collections
+import concurrent.futures
 import logging
 import threading
+import time
 
 from .model import Persisted, PersistedStat, ObjectNotFound, ObjectStore
 
-from typing import List, Optional, Dict, Union, Tuple
+from typing import List, Optional, Dict, Union, Tuple, Set
 
 
 _logger = logging.getLogger(__name__)
@@ -15,23 +18,87 @@ class CachedObjectStore:
     Also ObjectNotFound erros from the backend are not reflected in the cache.
     This is the implementation of a cache that favors archival over correctness
     (It is better to have data that may once have been correct, than none at all)
+
+    Each name is guarded by one of ``lock_stripes`` locks, so a slow backend
+    request only blocks the requests for names on the same stripe.
+    Concurrent get() calls for the same name are coalesced: one thread 
+    loads the object, the others wait for and share its result.
+
+    With ``refresh_in_background`` an outdated cache entry is returned right 
+    away while a background thread refreshes it from the backend.
+    Only a missing cache entry makes get() wait for the backend.
+
+    Names the backend did not find are remembered for ``negative_ttl`` 
+    seconds, meanwhile the backend is not asked for them again.
+
+    Recently loaded objects up to ``memory_max_object_size`` bytes are also kept
+    in memory, up to ``memory_maxsize`` bytes in total, until their ttl expires.
+    Setting ``memory_maxsize`` to 0 disables the in-memory cache.
+    Hot objects are thus served without asking the cache store.
+
+    put() writes the backend and the cache while holding the lock of the name,
+    so readers either get the old or the new object. A background refresh 
+    that was started before a put() does not overwrite the new cache entry.
     """
     backend: ObjectStore
     cache: ObjectStore
 
+    lock_stripes: int = 256
+    refresh_in_background: bool
+    negative_ttl: float
+    negative_maxsize: int = 4096
+    # small per store, every store of a worker has its own, 0 disables it
+    memory_maxsize: int = 4 * 1024 * 1024
+    memory_max_object_size: int = 256 * 1024
+
     _ttu: float
-    _lock: threading.RLock
+    _locks: List[threading.Lock]
+    # counts the put() calls per lock stripe, written holding the stripe 
+    # and the memory lock, compared to remember objects read without lock
+    _put_counts: List[int]
+    _inflight: Dict[str, 'concurrent.futures.Future[Optional[Persisted]]']
+    _inflight_lock: threading.Lock
+    _refreshing: Set[str]
+    _refresh_pool: Optional[concurrent.futures.ThreadPoolExecutor]
+    # name -> monotonic expiry time, in LRU order
+    _not_found: 'collections.OrderedDict[str, float]'
+    _not_found_lock: threading.Lock
+    # name -> fresh object, in LRU order
+    _memory: 'collections.OrderedDict[str, Persisted]'
+    _memory_size: int
+    _memory_lock: threading.Lock
 
     def __init__(
         self, 
         backend: ObjectStore, 
         cache: ObjectStore,
-        ttu: int
+        ttu: int,
+        refresh_in_background: bool = False,
+        negative_ttl: float = 60
     ) -> None:
         self.backend = backend
         self.cache = cache
+        self.refresh_in_background = refresh_in_background
+        self.negative_ttl = negative_ttl
         self._ttu = float(ttu)
-        self._lock= threading.RLock()
+        # a power of two, thus the stripe is just the masked hash
+        self._locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        self._put_counts = [0] * self.lock_stripes
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = None
+        self._not_found = collections.OrderedDict()
+        self._not_found_lock = threading.Lock()
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._memory_lock = threading.Lock()
+
+    def _stripe(self, name: str) -> int:
+        return hash(name) & (self.lock_stripes - 1)
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        return self._locks[self._stripe(name)]
 
     def _set_ttl(self, obj: PersistedStat) -> PersistedStat:
         if obj.ttl <= 0:
@@ -41,9 +108,15 @@ class CachedObjectStore:
         return obj
 
     def stat(self, name: str) -> PersistedStat:
-        obj: Optional[PersistedStat] = None
-        with self._lock:
-            # first try to get a not yet outdated S3 cache entry 
+        # fresh entries need no lock, the cache stores are thread safe
+        obj: Optional[PersistedStat] = self._get_memory(name)
+        if obj is None:
+            obj = self._head_cache(name, self._ttu)
+        if obj is not None:
+            return obj
+
+        with self._lock_for(name):
+            # check again, another thread may have updated the cache meanwhile
             obj = self._head_cache(name, self._ttu)
 
             # try to update the cache
@@ -79,44 +152,197 @@ class CachedObjectStore:
             _logger.debug(f"Item {name} not found in cache: " + str(e))
             return None
     
+    def _is_not_found(self, name: str) -> bool:
+        with self._not_found_lock:
+            expiry = self._not_found.get(name)
+            if expiry is None:
+                return False
+            if expiry <= time.monotonic():
+                del self._not_found[name]
+                return False
+            self._not_found.move_to_end(name)
+            return True
+
+    def _mark_not_found(self, name: str) -> None:
+        if self.negative_ttl <= 0:
+            return
+        with self._not_found_lock:
+            self._not_found[name] = time.monotonic() + self.negative_ttl
+            self._not_found.move_to_end(name)
+            while len(self._not_found) > self.negative_maxsize:
+                self._not_found.popitem(last=False)
+
+    def _get_memory(self, name: str) -> Optional[Persisted]:
+        with self._memory_lock:
+            obj = self._memory.get(name)
+            if obj is None:
+                return None
+            if obj.is_expired():
+                self._forget_memory_locked(name)
+                return None
+            self._memory.move_to_end(name)
+            return obj
+
+    def _remember(self, name: str, obj: Persisted, put_count: Optional[int] = None) -> None:
+        # only objects with the ttl set by _set_ttl(), else they never expire
+        if obj.size > self.memory_max_object_size or obj.size > self.memory_maxsize:
+            return
+        with self._memory_lock:
+            # read without lock: a put() since the read may have replaced it
+            if put_count is not None and put_count != self._put_counts[self._stripe(name)]:
+                return
+            self._forget_memory_locked(name)
+            self._memory[name] = obj
+            self._memory_size += obj.size
+            while self._memory_size > self.memory_maxsize:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.size
+
+    def _forget_memory_locked(self, name: str) -> None:
+        obj = self._memory.pop(name, None)
+        if obj is not None:
+            self._memory_size -= obj.size
+
     def _head_backend(self, name) -> Optional[PersistedStat]:
+        if self._is_not_found(name):
+            return None
         try:
             return self._set_ttl(self.backend.stat(name))
         except ObjectNotFound as e:
+            self._mark_not_found(name)
             return None
 
     def _get_backend(self, name) -> Optional[Persisted]:
+        if self._is_not_found(name):
+            _logger.debug(f"Item {name} recently not found in backend")
+            return None
         try:
+            # revalidate the outdated cache entry instead of downloading it again
+            get_if_modified = getattr(self.backend, 'get_if_modified', None)
+            if get_if_modified and (stale := self._head_cache(name, float('inf'))) is not None:
+                obj = get_if_modified(name, stale)
+                if obj is None:
+                    _logger.debug(f"Item {name} not modified in backend")
+                    obj = self.cache.get(name)
+                    obj.last_fetched = time.time()
+                return self._set_ttl(obj)
+
             return self._set_ttl(self.backend.get(name))
         except ObjectNotFound as e:
             _logger.debug(f"Item {name} not found in backend: " + str(e))
+            self._mark_not_found(name)
             return None
 
     def get(self, name: str) -> Persisted:
-        with self._lock:
-            obj: Optional[Persisted] = None
+        obj = self.get_or_none(name)
+        if obj is None:
+            raise ObjectNotFound()
+        return obj
+
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        # fresh entries need no lock, the cache stores are thread safe
+        obj = self._get_fresh(name)
+        if obj is not None:
+            return obj
+
+        with self._inflight_lock:
+            future = self._inflight.get(name)
+            if is_owner := future is None:
+                future = self._inflight[name] = concurrent.futures.Future()
 
+        if not is_owner:
+            return future.result()
+
+        try:
+            obj = self._load(name)
+            future.set_result(obj)
+            return obj
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[name]
+
+    def _get_fresh(self, name: str) -> Optional[Persisted]:
+        obj = self._get_memory(name)
+        if obj is None:
+            put_count = self._put_counts[self._stripe(name)]
             # first try to get a not yet outdated S3 cache entry 
             obj = self._get_cache(name, self._ttu)
+            if obj is not None:
+                self._remember(name, obj, put_count)
+        return obj
+
+    def _load(self, name: str) -> Optional[Persisted]:
+        with self._lock_for(name):
+            # check again, another thread may have updated the cache meanwhile
+            obj = self._get_fresh(name)
+
+            if obj is None and self.refresh_in_background:
+                # serve the outdated entry, if any, and update it later
+                obj = self._get_cache(name, float('inf'))
+                if obj is not None:
+                    self._refresh_later(name)
+                    return obj
 
             # try to update the cache
             if obj is None:
                 obj = self._get_backend(name)
                 if obj is not None:
                     self.cache.put(name, obj)
+                    self._remember(name, obj)
             
             # if still so success, retry the cache accepting outdated data
             if obj is None:
                 obj = self._get_cache(name, float('inf'))
-
-            # finally give up
-            if obj is None:
-                raise ObjectNotFound()
             return obj
 
+    def _refresh_later(self, name: str) -> None:
+        with self._inflight_lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+            if self._refresh_pool is None:
+                self._refresh_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=2, 
+                    thread_name_prefix='amc2-refresh'
+                )
+        self._refresh_pool.submit(self._refresh, name)
+
+    def _refresh(self, name: str) -> None:
+        try:
+            stripe = self._stripe(name)
+            put_count = self._put_counts[stripe]
+            # the readers keep getting the outdated entry meanwhile, 
+            # thus don't hold the lock while waiting for the backend
+            obj = self._get_backend(name)
+            if obj is not None:
+                with self._locks[stripe]:
+                    # a put() in between may have stored a newer object,
+                    # skipping the refresh then is fine, the next get() retries
+                    if put_count == self._put_counts[stripe]:
+                        self.cache.put(name, obj)
+                        self._remember(name, obj)
+        except Exception as e:
+            _logger.error(f"Failed to refresh item {name}: " + str(e))
+        finally:
+            with self._inflight_lock:
+                self._refreshing.discard(name)
+
     def put(self, name: str, obj: Persisted) -> None:
-        with self._lock:
+        with self._lock_for(name):
             # may raise WriteNotSupported to prevent the put request
             self.backend.put(name, obj)
-            # if put was successfull, keep the cache coherent
-            self.cache.put(name, obj)
+            try:
+                # if put was successfull, keep the cache coherent
+                self.cache.put(name, obj)
+            finally:
+                with self._memory_lock:
+                    # counted once the cache holds the new object, so a reader
+                    # either got the new one or does not remember the old one
+                    self._put_counts[self._stripe(name)] += 1
+                    # the stored object has no ttl yet, load it again when needed
+                    self._forget_memory_locked(name)
+            with self._not_found_lock:
+                self._not_found.pop(name, None)
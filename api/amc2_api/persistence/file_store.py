@@ -1,3 +1,4 @@
+import functools
 import logging
 import pathlib
 import threading
@@ -14,6 +15,9 @@ from typing import List, Optional, Dict, Union, Tuple
 
 _logger = logging.getLogger(__name__)
 
+# prefetch hint for whole file reads, not available on every platform
+_fadvise_sequential: Optional[int] = getattr(os, 'POSIX_FADV_SEQUENTIAL', None)
+
 
 def parse_file_url(url: str) -> pathlib.Path:
     if not url.startswith('file://'):
@@ -34,39 +38,73 @@ def guess_file_content_type(path: Union[str, pathlib.Path]) -> str:
         - https://www.freedesktop.org/wiki/CommonExtendedAttributes/
         - https://docs.python.org/3/library/mimetypes.html
     """
-    mime: Optional[str] = None
     try:
         # if present the xattr shall be leading
-        mime = xattr.xattr(path).get('user.mime_type').decode()
+        return xattr.xattr(path).get('user.mime_type').decode()
     except (OSError, UnicodeError):
-        # guess based on the extension
-        mime, _ = mimetypes.guess_type(path)
-    
+        return _guess_content_type_by_extension(path)
+
+
+def _guess_content_type_by_extension(path: Union[str, pathlib.Path]) -> str:
+    # a cache holds few distinct extensions, look them up only once
+    return _guess_content_type_by_suffixes(''.join(pathlib.PurePath(path).suffixes))
+
+
+@functools.lru_cache(maxsize=256)
+def _guess_content_type_by_suffixes(suffixes: str) -> str:
+    mime, _ = mimetypes.guess_type('file' + suffixes)
     # fallback to octet-stream
     return mime if mime is not None else 'application/octet-stream'
 
 
 class XAttrFile:
+    """
+    If a file descriptor is given, the attributes are accessed through it 
+    instead of looking up the path again for every attribute.
+    """
     path: pathlib.Path
     namespace: str
+    fd: Optional[int]
 
-    def __init__(self, path: Union[str, pathlib.Path], ns: str = 'user') -> None:
+    def __init__(self, path: Union[str, pathlib.Path], ns: str = 'user', fd: Optional[int] = None) -> None:
         self.path = pathlib.Path(path)
         self.namespace = ns
+        self.fd = fd
     
     def full_key(self, key: str) -> str:
         return '.'.join([self.namespace, key])
 
+    def _xattr(self) -> xattr.xattr:
+        return xattr.xattr(self.fd if self.fd is not None else self.path)
+
     def get_attr(self, key: str, default: Optional[str] = None) -> Optional[str]:
         try:
-            return xattr.xattr(self.path).get(self.full_key(key)).decode()
+            return self._xattr().get(self.full_key(key)).decode()
         except (OSError, UnicodeError):
             return default
+
+    def get_attrs(self, keys: Tuple[str, ...]) -> Dict[str, str]:
+        """Returns the present attributes of the given keys, listing the attributes only once"""
+        values: Dict[str, str] = {}
+        try:
+            attrs = self._xattr()
+            present = set(attrs.list())
+            for key in keys:
+                full_key = self.full_key(key)
+                if full_key not in present:
+                    continue
+                try:
+                    values[key] = attrs.get(full_key).decode()
+                except (OSError, UnicodeError):
+                    pass
+        except OSError:
+            pass
+        return values
     
     def set_attr(self, key: str, value: str) -> None:
         key = self.full_key(key)
         try:
-            xattr.xattr(self.path).set(key, value.encode())
+            self._xattr().set(key, value.encode())
         except OSError as e:
             _logger.error(f"Failed to set xattr {key} for {self.path}: {e}")
 
@@ -82,10 +120,14 @@ class FileObjectStore:
 
     The content_type is stored as xattr using the Freedesktop standard (user.mime_type).
     If not present, the mime is guessed using the file extension.
+
+    Files are replaced atomically by put(), thus reading needs no lock. 
+    Writes to the same path are serialized by one of ``lock_stripes`` locks.
     """
 
     base_path: pathlib.Path
-    _lock: threading.RLock
+    lock_stripes: int = 64
+    _locks: List[threading.Lock]
 
     def __init__(self, base_path: Union[pathlib.Path, str]) -> None:
         if isinstance(base_path, pathlib.Path):
@@ -95,7 +137,10 @@ class FileObjectStore:
         else:
             self.base_path = pathlib.Path(base_path)
 
-        self._lock = threading.RLock()
+        self._locks = [threading.Lock() for _ in range(self.lock_stripes)]
+
+    def _lock_for(self, path: pathlib.Path) -> threading.Lock:
+        return self._locks[hash(path) & (self.lock_stripes - 1)]
 
     def _name2path(self, name: str) -> pathlib.Path:
         if name.startswith('file://'):
@@ -105,58 +150,77 @@ class FileObjectStore:
         else:
             return self.base_path.joinpath(name)
 
-    def _get_metadata(self, path: pathlib.Path) -> Dict[str, str]:
+    def _get_metadata(self, path: pathlib.Path, fd: Optional[int] = None) -> Dict[str, str]:
         keys = (
             'mime_type',
             'last_modified',
             'last_fetched',
+            'etag',
         )
-        metadata: Dict[str, str] = {}
-        file = XAttrFile(path, ns='user')
-
-        for key in keys:
-            if value := file.get_attr(key) is not None:
-                metadata[key] = value
-        return metadata
+        return XAttrFile(path, ns='user', fd=fd).get_attrs(keys)
     
-    def _set_metadata(self, path: pathlib.Path, metadata: Dict[str, str]) -> None:
-        file = XAttrFile(path, ns='user')
+    def _set_metadata(self, path: pathlib.Path, metadata: Dict[str, str], fd: Optional[int] = None) -> None:
+        file = XAttrFile(path, ns='user', fd=fd)
         for key, value in metadata.items():
             file.set_attr(key, value)
 
-    def stat(self, name: str) -> PersistedStat:
-        path = self._name2path(name)
-        try:
-            with self._lock:
-                stat = path.stat()
-                mime = guess_file_content_type(path)
-                metadata = self._get_metadata(path)
-        except OSError as e:
-            _logger.debug(f"File HEAD '{path}' 404, {str(e)}")
-            raise ObjectNotFound()
+    def _make_stat(self, path: pathlib.Path, stat: os.stat_result, metadata: Dict[str, str]) -> PersistedStat:
+        # the mime_type xattr is leading, as in guess_file_content_type()
+        mime = metadata.get('mime_type') or _guess_content_type_by_extension(path)
 
         mtime = parse_mtime(metadata.get('last_modified'), stat.st_mtime)
         ftime = parse_mtime(metadata.get('last_fetched'), mtime)
 
-        _logger.debug(f"File STAT '{path}' 200")
         return PersistedStat(
             content_type=mime,
             last_modified=mtime,
             last_fetched=ftime,
             size=stat.st_size,
+            etag=metadata.get('etag', ''),
         )
 
+    def stat(self, name: str) -> PersistedStat:
+        path = self._name2path(name)
+        try:
+            stat = path.stat()
+            metadata = self._get_metadata(path)
+        except OSError as e:
+            _logger.debug(f"File HEAD '{path}' 404, {str(e)}")
+            raise ObjectNotFound()
+
+        _logger.debug(f"File STAT '{path}' 200")
+        return self._make_stat(path, stat, metadata)
+
     def get(self, name: str) -> Persisted:
         path = self._name2path(name)
-        with self._lock:
-            stat = self.stat(name)
-            try:
-                with open(path, 'rb') as fh:
-                    data = fh.read()
-                    _logger.debug(f"File GET '{path}' 200 {len(data)}")
-                    return Persisted.with_data(stat, data)
-            except OSError as e:
-                _logger.error(f"Failed to read file {path}: {e}")
+        try:
+            # unbuffered: the file is read in one go into a buffer sized 
+            # from fstat, no need to pass it through a BufferedReader
+            fh = open(path, 'rb', buffering=0)
+        except OSError as e:
+            _logger.debug(f"File GET '{path}' 404, {str(e)}")
+            raise ObjectNotFound()
+
+        try:
+            with fh:
+                # stat and metadata through the open file, the path is looked up once
+                fd = fh.fileno()
+                stat = self._make_stat(path, os.fstat(fd), self._get_metadata(path, fd=fd))
+                if _fadvise_sequential is not None:
+                    os.posix_fadvise(fd, 0, 0, _fadvise_sequential)
+                data = fh.readall()
+        except OSError as e:
+            _logger.error(f"Failed to read file {path}: {e}")
+            raise ObjectNotFound()
+
+        _logger.debug(f"File GET '{path}' 200 {len(data)}")
+        return Persisted.with_data(stat, data)
+
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        try:
+            return self.get(name)
+        except ObjectNotFound:
+            return None
 
     def put(self, name: str, obj: Persisted) -> None:
         path = self._name2path(name)
@@ -166,14 +230,25 @@ class FileObjectStore:
             'last_modified': format_mtime(obj.last_modified),
             'last_fetched': format_mtime(obj.last_fetched),
         }
+        # the origin's etag, to revalidate the object with a conditional request
+        if obj.etag:
+            metadata['etag'] = obj.etag
 
-        with self._lock:
+        with self._lock_for(path):
             path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, 'wb') as fh:
-                fh.write(obj.data)
-            
-            os.utime(path, times=(time.time(), obj.last_modified))
-            self._set_metadata(path, metadata)
+            # write aside and rename, readers see either the old or the new file
+            tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+            try:
+                with open(tmp_path, 'wb') as fh:
+                    fh.write(obj.data)
+                    # setting xattrs leaves the mtime alone, so reuse the open file
+                    self._set_metadata(tmp_path, metadata, fd=fh.fileno())
+                
+                os.utime(tmp_path, times=(time.time(), obj.last_modified))
+                os.replace(tmp_path, path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
 
             _logger.debug(f"File PUT '{path}' 200 {obj.size}")
 
@@ -208,5 +283,8 @@ class NullObjectStore:
     def get(self, name: str) -> Persisted:
         raise ObjectNotFound(name)
 
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        return None
+
     def put(self, name: str, obj: Persisted) -> None:
         pass
@@ -2,10 +2,11 @@ import logging
 import email.utils
 
 import requests
+import requests.adapters
 
 from amc2_api.utils import Throttler, parse_mime, URL
 
-from .model import Persisted, PersistedStat, ObjectNotFound, WriteNotSupported
+from .model import Persisted, PersistedStat, ObjectNotFound, WriteNotSupported, parse_http_date
 
 from typing import List, Optional, Dict, Union, Tuple, Mapping, Callable
 
@@ -43,12 +44,20 @@ class MaybeThrottler:
 class HTTPObjectStore:
     """
     Abstract base class for implementing an object store using the HTTP protocol.
+
+    With ``conditional_get`` enabled, ``get_if_modified()`` revalidates a 
+    previously fetched object using ``If-None-Match``/``If-Modified-Since``.
+
+    With ``stream_content`` enabled, the body is not loaded before calling 
+    ``_make_content()``, which can then read it from ``response.raw``.
     """
     user_agent: str = ''
+    conditional_get: bool = False
+    stream_content: bool = False
 
     _req_throttler: MaybeThrottler
     _err_throttler: MaybeThrottler
-    _default_headers: Dict[str, str]
+    _session: requests.Session
 
     def __init__(
         self, 
@@ -58,18 +67,18 @@ class HTTPObjectStore:
         self._req_throttler = MaybeThrottler(req_interval)
         self._err_throttler = MaybeThrottler(err_interval)
 
-        self._default_headers = {}
+        # keep the connections alive, many requests go to the same host
+        # no automatic retries, they would bypass the request and error throttlers
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+        )
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # sent with every request, requests merges them with the per request headers
         if self.user_agent:
-            self._default_headers['User-Agent'] = self.user_agent
-
-    def _combine_headers(self, headers: Dict[str, str], top: Dict[str, str]) -> Dict[str,str]:
-        headers = headers.copy()
-        for name, value in top.items():
-            if name in headers and not value:
-                del headers[name]
-            elif name:
-                headers[name] = value
-        return headers
+            self._session.headers['User-Agent'] = self.user_agent
 
     def _http(
         self, 
@@ -77,6 +86,7 @@ class HTTPObjectStore:
         url: Union[URL, str], 
         headers: Optional[Dict[str, str]] = None, 
         http_errors: Union[bool, Callable[[requests.Response], None]] = True,
+        stream: bool = False,
     ) -> requests.Response:
 
         # don't flood the API when there are errors, one error never comes alone
@@ -86,14 +96,12 @@ class HTTPObjectStore:
         # make sure we stay in the given request rate limit by serializing
         self._req_throttler.wait()
 
-        if headers is None:
-            headers = {}
-
-        response = requests.request(
+        response = self._session.request(
             verb.upper(),
             str(url),
-            headers=self._combine_headers(self._default_headers, headers),
-            allow_redirects=True
+            headers=headers,
+            allow_redirects=True,
+            stream=stream
         )
 
         if response.ok:
@@ -105,10 +113,15 @@ class HTTPObjectStore:
                 self._err_throttler.mark()
 
             # call the user provided error handler or the default to raise the exception
-            if callable(http_errors):
-                http_errors(response)
-            elif http_errors:
-                self._handle_http_errors(response)
+            try:
+                if callable(http_errors):
+                    http_errors(response)
+                elif http_errors:
+                    self._handle_http_errors(response)
+            except BaseException:
+                # a streamed body is never read, give the connection back to the pool
+                response.close()
+                raise
             
         return response
 
@@ -124,7 +137,7 @@ class HTTPObjectStore:
             return None
         
         try:
-            return email.utils.parsedate_to_datetime(value).timestamp()
+            return parse_http_date(value)
         except ValueError as e:
             _logger.warning("Error parsing last-midified header: " + str(e))
             return None
@@ -134,10 +147,23 @@ class HTTPObjectStore:
 
     def _make_headers(self, name: str, stat: bool) -> Dict[str, str]:
         return {}
+
+    def _make_conditional_headers(self, stat: PersistedStat) -> Dict[str, str]:
+        headers = {'If-Modified-Since': email.utils.formatdate(stat.last_modified, usegmt=True)}
+        if stat.etag:
+            headers['If-None-Match'] = stat.etag
+        return headers
     
     def _make_content(self, name: str, response: requests.Response) -> bytes:
         # may be overridden to modify the content
-        return response.content
+        if not self.stream_content:
+            return response.content
+        # response.content joins the body from small chunks, a single read 
+        # lets urllib3 return the body as one bytes object instead
+        try:
+            return response.raw.read(decode_content=True)
+        finally:
+            response.close()
 
     def _make_stat(self, name: str, response: requests.Response) -> PersistedStat:
         mime = response.headers['content-type']
@@ -146,7 +172,8 @@ class HTTPObjectStore:
         return PersistedStat(
             content_type=mime,
             last_modified=mtime,
-            size=size
+            size=size,
+            etag=response.headers.get('etag', '')
         )
 
     def _make_persisted(self, name: str, response: requests.Response) -> Persisted:
@@ -156,7 +183,8 @@ class HTTPObjectStore:
         return Persisted(
             content_type=mime, 
             last_modified=mtime,
-            data=content
+            data=content,
+            etag=response.headers.get('etag', '')
         )
 
     def stat(self, name: str) -> PersistedStat:
@@ -173,7 +201,35 @@ class HTTPObjectStore:
         try:
             url = self._make_url(name, stat=False)
             headers = self._make_headers(name, stat=False)
-            response = self._http('GET', url, headers=headers)
+            response = self._http('GET', url, headers=headers, stream=self.stream_content)
+            return self._make_persisted(name, response)
+        except ObjectNotFound as e:
+            e.object_name = name
+            raise e
+
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        try:
+            return self.get(name)
+        except ObjectNotFound:
+            return None
+
+    def get_if_modified(self, name: str, stat: PersistedStat) -> Optional[Persisted]:
+        """
+        Returns None if the object did not change since it was fetched, 
+        as described by the given stat. 
+        """
+        if not self.conditional_get:
+            return self.get(name)
+
+        try:
+            url = self._make_url(name, stat=False)
+            headers = self._make_headers(name, stat=False)
+            headers.update(self._make_conditional_headers(stat))
+            response = self._http('GET', url, headers=headers, stream=self.stream_content)
+            if response.status_code == 304:
+                _logger.debug(f"HTTP GET '{name}' 304 not modified")
+                response.close()
+                return None
             return self._make_persisted(name, response)
         except ObjectNotFound as e:
             e.object_name = name
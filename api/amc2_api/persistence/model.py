@@ -1,4 +1,6 @@
 import datetime
+import email.utils
+import functools
 import time
 
 from typing import List, Optional, Dict, Union, Tuple, Protocol, Any
@@ -12,12 +14,28 @@ class WriteNotSupported(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=1024)
+def _parse_iso_mtime(value: str) -> float:
+    # the stores keep parsing the same few timestamps from their metadata
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_http_date(value: str) -> float:
+    # the Last-Modified headers of many objects share the same second
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except TypeError:
+        # older Pythons fail this way for malformed dates
+        raise ValueError(f"Invalid HTTP date '{value}'")
+
+
 def parse_mtime(value: Any, default: Optional[float] = None) -> float:
     try:
         if isinstance(value, datetime.datetime):
             return value.timestamp()
         elif isinstance(value, str):
-            return datetime.datetime.fromisoformat(value).timestamp()
+            return _parse_iso_mtime(value)
         elif isinstance(value, float):
             return value
         elif value is None:
@@ -35,10 +53,14 @@ def format_mtime(value: float) -> str:
 
 
 class PersistedStat:
+    # read on every cache lookup, slots keep the attribute access cheap
+    __slots__ = ('content_type', 'etag', '_last_modified', '_last_fetched', 'ttl', '_size')
+
     content_type: str
+    etag: str
     _last_modified: float
     _last_fetched: float
-    _ttl: float
+    ttl: float
     _size: int
 
     def __init__(
@@ -48,8 +70,10 @@ class PersistedStat:
         last_fetched: Optional[float] = None,
         ttl: float = -1,
         size: int = 0,
+        etag: str = '',
     ) -> None:
         self.content_type = content_type
+        self.etag = etag
 
         if last_modified is None:
             last_modified = time.time()
@@ -93,14 +117,6 @@ class PersistedStat:
             raise ValueError("last_fetched date must be a positive value")
         self._last_fetched = value
 
-    @property
-    def ttl(self) -> float:
-        return self._ttl
-    
-    @ttl.setter
-    def ttl(self, value: float) -> None:
-        self._ttl = value
-
     def is_expired(
         self, 
         ttl: Union[None, float, int] = None,
@@ -116,15 +132,17 @@ class PersistedStat:
         elif isinstance(now, datetime.datetime):
             now = now.timestamp()
         
-        return now >= (self.last_fetched + ttl)
+        return now >= self._last_fetched + ttl
     
     def expiry_time(self):
-        if self._ttl < 0:
+        if self.ttl < 0:
             return float("inf")
-        return self._last_fetched + self._ttl
+        return self._last_fetched + self.ttl
 
 
 class Persisted(PersistedStat):
+    __slots__ = ('data',)
+
     data: bytes
 
     def __init__(
@@ -134,12 +152,14 @@ class Persisted(PersistedStat):
         last_fetched: Optional[float] = None,
         ttl: float = -1,
         data: bytes = b'',
+        etag: str = '',
     ) -> None:
         super().__init__(
             content_type=content_type,
             last_modified=last_modified,
             last_fetched=last_fetched,
-            ttl=ttl
+            ttl=ttl,
+            etag=etag
         )
         self.data = data
 
@@ -150,7 +170,8 @@ class Persisted(PersistedStat):
             last_modified=base.last_modified,
             last_fetched=base.last_fetched,
             ttl=base.ttl,
-            data=data
+            data=data,
+            etag=base.etag
         )
     
     @property
@@ -170,6 +191,10 @@ class ObjectStore(Protocol):
     def get(self, name: str) -> Persisted:
         raise NotImplementedError()
 
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        # like get(), but a missing object is not an exceptional case
+        raise NotImplementedError()
+
     def put(self, name: str, obj: Persisted) -> None:
         # read only stores shall raise WriteNotSupported
         raise NotImplementedError()
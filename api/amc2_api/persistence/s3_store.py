@@ -7,7 +7,7 @@ import minio
 from urllib3.response import HTTPResponse
 
 from amc2_api.utils import URL
-from .model import Persisted, PersistedStat, ObjectNotFound, parse_mtime, format_mtime
+from .model import Persisted, PersistedStat, ObjectNotFound, parse_mtime, parse_http_date, format_mtime
 
 from typing import List, Optional, Dict, Union, Tuple, cast, Any, Dict
 
@@ -21,6 +21,7 @@ class S3ObjectStore:
     path: str
     secure: bool
     empty_is_abstent: bool
+    _client: minio.Minio
 
     @classmethod
     def from_url(cls, url: Union[str, URL]) -> 'S3ObjectStore':
@@ -51,44 +52,51 @@ class S3ObjectStore:
         self.path = path
         self.secure = secure
         self.empty_is_abstent = no_empty
+        # the client is thread safe, share its connection pool for all requests
+        self._client = minio.Minio(self.endpoint, secure=self.secure)
     
     def _make_path(self, name: str) -> str:
         return self.path + '/' + name if self.path else name
     
+    def _make_stat(self, headers: Any) -> PersistedStat:
+        # stat_object() and get_object() both respond with the object headers
+        size = int(headers.get('content-length', '0'))
+        if self.empty_is_abstent and size == 0:
+            raise ObjectNotFound()
+
+        last_modified = headers.get('last-modified')
+        obj_mtime = parse_http_date(last_modified) if last_modified else time.time()
+        mtime = parse_mtime(headers.get('x-amz-meta-last-modified'), obj_mtime)
+        ftime = parse_mtime(headers.get('x-amz-meta-last-fetched'), mtime)
+
+        return PersistedStat(
+            content_type=headers.get('content-type', 'application/octet-stream'),
+            last_modified=mtime,
+            last_fetched=ftime,
+            size=size,
+            etag=headers.get('x-amz-meta-etag', '')
+        )
+
     def _stat(self, client: minio.Minio, name: str) -> PersistedStat:
         try:
             obj = client.stat_object(self.bucket, self._make_path(name))
-            metadata = cast(Dict[str, Any], obj.metadata)
-
-            if self.empty_is_abstent and obj.size == 0:
-                raise ObjectNotFound()
-
-            obj_mtime = parse_mtime(obj.last_modified, time.time())
-            mtime = parse_mtime(metadata.get('x-amz-meta-last-modified'), obj_mtime)
-            ftime = parse_mtime(metadata.get('x-amz-meta-last-fetched'), mtime)
-
-            return PersistedStat(
-                content_type=cast(str, obj.content_type),
-                last_modified=mtime,
-                last_fetched=ftime,
-                size=cast(int, obj.size)
-            )
+            return self._make_stat(obj.metadata)
         except minio.error.S3Error as e:
             if e.code == 'NoSuchKey':
                 raise ObjectNotFound()
             raise e
 
     def stat(self, name: str) -> PersistedStat:
-        client = minio.Minio(self.endpoint, secure=self.secure)
-        return self._stat(client, name)
+        return self._stat(self._client, name)
 
     def get(self, name: str) -> Persisted:
-        client = minio.Minio(self.endpoint, secure=self.secure)
+        client = self._client
 
-        stat = self._stat(client, name)
+        # no HEAD request beforehand, the stat is taken from the GET response
         response: Optional[HTTPResponse] = None
         try:
             response = client.get_object(self.bucket, self._make_path(name))
+            stat = self._make_stat(response.headers)
             return Persisted.with_data(stat, response.data)
         except minio.error.S3Error as e:
             if e.code == 'NoSuchKey':
@@ -99,12 +107,21 @@ class S3ObjectStore:
                 response.close()
                 response.release_conn()
 
+    def get_or_none(self, name: str) -> Optional[Persisted]:
+        try:
+            return self.get(name)
+        except ObjectNotFound:
+            return None
+
     def put(self, name: str, obj: Persisted) -> None:
-        client = minio.Minio(self.endpoint, secure=self.secure)
+        client = self._client
         metadata = {
             'x-amz-meta-last-fetched': format_mtime(obj.last_fetched),
             'x-amz-meta-last-modified': format_mtime(obj.last_modified)
         }
+        # the origin's etag, to revalidate the object with a conditional request
+        if obj.etag:
+            metadata['x-amz-meta-etag'] = obj.etag
         client.put_object(
             self.bucket, 
             self._make_path(name), 
@@ -1,7 +1,6 @@
 import datetime
 import logging
-import json
-import copy
+import orjson
 
 from amc2_api.model import Title, Episode, Anime, Image, ImageType, TmdbSeasonId, CastRole, Rating, Credit, Season
 
@@ -17,19 +16,27 @@ def iter_collection(obj: Any, collection_key: str, item_key: str) -> Iterator[Tu
             yield item, str(num)
 
 
+# the image collections of the tmdb /images endpoints, in the order of the parsed list
+_image_collections = (
+    ('posters', ImageType.poster),
+    ('backdrops', ImageType.backdrop),
+    ('stills', ImageType.thumb),
+)
+
+
 class AnimeTmdbJsonParser:
     language: str
 
     @classmethod
     def parse(
         cls, 
-        json_data: str, 
+        json_data: Union[str, bytes], 
         lang: str = 'en'
     ) -> Optional[Anime]:
         try:
-            root = json.loads(json_data)
+            root = orjson.loads(json_data)
             return cls(lang=lang).parse_anime(root)
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise ValueError("Invalid JSON: " + str(e))
     
     def __init__(self, lang: str = 'en') -> None:
@@ -46,13 +53,16 @@ class AnimeTmdbJsonParser:
         return int(obj[key])
     
     def _parse_date(self, obj: Any, key: str, default: str) -> datetime.date:
-        if key not in obj or not obj[key]:
+        value = obj.get(key)
+        if value and isinstance(value, str):
+            return datetime.date.fromisoformat(value)
+        if not value:
             return datetime.date.fromisoformat(default)
-        return datetime.date.fromisoformat(str(obj[key]))
+        return datetime.date.fromisoformat(str(value))
     
     def _parse_image(self, obj: Any, img_type: ImageType) -> Image:
         name = str(obj['file_path']).strip('/')
-        return Image(type=img_type, name=name, source='tmdb')
+        return Image.trusted('tmdb', name, img_type)
     
     def _parse_vote(self, obj: Any) -> Optional[Rating]:
         try:
@@ -67,48 +77,43 @@ class AnimeTmdbJsonParser:
     def parse_cast(self, list_obj: Any) -> List[CastRole]:
         roles: List[CastRole] = []
         for obj in list_obj:
-            iname = cname = aname = ""
-            if 'roles' in obj and len(obj['roles']) > 0 and 'character' in obj['roles'][0]:
-                cname = obj['roles'][0]['character']
-            if 'name' in obj:
-                aname = obj['name']
-            if 'profile_path' in obj:
-                iname = str(obj['profile_path']).strip('/')
-
+            get = obj.get
+            obj_roles = get('roles')
+            cname = obj_roles[0].get('character') if obj_roles else None
+            aname = get('name')
             if not cname or not aname:
                 continue
             
             role = CastRole(character=cname, actor=aname)
-            if iname:
-                role.actor_image = Image(type=ImageType.thumb, name=iname, source='tmdb')
+            # tmdb sends null for actors without a picture
+            if iname := str(get('profile_path') or '').strip('/'):
+                role.actor_image = Image.trusted('tmdb', iname, ImageType.thumb)
             roles.append(role)
         return roles
     
     def parse_credits(self, list_obj: Any) -> List[Credit]:
         credits: List[Credit] = []
         for obj in list_obj:
-            name = obj.get('name', '')
-            dep = obj.get('department', '')
-
-            cat = obj.get('known_for_department', None)
-            if cat is None:
-                cat = ''
-            cat = cat.lower()
+            get = obj.get
+            name = get('name', '')
+            dep = get('department', '')
+            if not name or not dep:
+                continue
 
-            jobs = [job['job'] for job in obj.get('jobs', []) if job['job']]
-            
-            if name and dep:
-                for job in jobs:
-                    credit = Credit(name=name, job=job, department=dep, category=cat)
-                    credits.append(credit)
+            cat = (get('known_for_department') or '').lower()
+            for job in get('jobs', []):
+                if job_name := job.get('job'):
+                    credits.append(Credit(name=name, job=job_name, department=dep, category=cat))
 
         return credits
 
     def parse_images(self, images: Any) -> List[Image]:
         imgs: List[Image] = []
-        imgs += [self._parse_image(o, ImageType.poster) for o in images.get('posters', [])]
-        imgs += [self._parse_image(o, ImageType.backdrop) for o in images.get('backdrops', [])]
-        imgs += [self._parse_image(o, ImageType.thumb) for o in images.get('stills', [])]
+        append = imgs.append
+        parse_image = self._parse_image
+        for key, img_type in _image_collections:
+            for o in images.get(key, ()):
+                append(parse_image(o, img_type))
         return imgs
 
     def parse_episode(self, episode: Any) -> Episode:
@@ -119,9 +124,8 @@ class AnimeTmdbJsonParser:
         summary = self._parse_str(episode, 'overview', '')
         images = self.parse_images(episode.get('images', {}))
 
-        ratings: List[Rating] = []
-        if (vote := self._parse_vote(episode)) is not None:
-            ratings = [vote]
+        vote = self._parse_vote(episode)
+        ratings: List[Rating] = [vote] if vote is not None else []
 
         return Episode(
             number=episode_num,
@@ -134,10 +138,10 @@ class AnimeTmdbJsonParser:
         )
 
 
-    def parse_season(self, season: Any, parent_id: str) -> Season:
+    def parse_season(self, season: Any, parent_id: str, genres: Optional[List[str]] = None) -> Season:
         season_num = self._parse_int(season, 'season_number', 0)
         season_name = self._parse_str(season, 'name', '')
-        anime_id = str(TmdbSeasonId((parent_id, season_num)))
+        anime_id = TmdbSeasonId.format(int(parent_id), season_num)
 
         title = Title(lang=self.language, type='main', value=season_name, aid=anime_id)
 
@@ -157,8 +161,8 @@ class AnimeTmdbJsonParser:
             credits = self.parse_credits(season['credits']['crew'])
 
         airdate: Optional[datetime.date] = None
-        if 'air_date' in season and season['air_date']:
-            airdate = datetime.date.fromisoformat(str(season['air_date']))
+        if air_date := season.get('air_date'):
+            airdate = datetime.date.fromisoformat(str(air_date))
 
         return Season(
             id=anime_id,
@@ -167,7 +171,8 @@ class AnimeTmdbJsonParser:
             titles=[title], 
 
             description=descr, 
-            genres=[],
+            # seasons dont have generes, the tvshow has
+            genres=genres if genres is not None else [],
             tags=[],
             airdate=airdate,
             episodes=episodes,
@@ -199,23 +204,27 @@ class AnimeTmdbJsonParser:
         credits: List[Credit] = []
         airdate: Optional[datetime.date] = None
 
+        # the parsed models are not modified afterwards, the seasons can share them
+        backdrops = [img for img in images if img.type == ImageType.backdrop]
+
         seasons: List[Season] = []
+        # a show may have dozens of seasons, skip the attribute lookups
+        parse_season = self.parse_season
+        append_season = seasons.append
         for season_obj, sid in iter_collection(root, 'seasons', 'season_number'):
-            season = self.parse_season(season_obj, show_id)
-
-            # seasons dont have generes
-            season.genres = genres
+            # passed in, assigning the validated field would copy it again
+            season = parse_season(season_obj, show_id, genres)
 
             # seasons don't have a backdrop, the main tvshow has
-            season.images += [copy.deepcopy(img) for img in images if img.type == ImageType.backdrop]
+            season.images.extend(backdrops)
 
             if sid == '1':
                 # heuristic to populate missing tvshow metadata with the data from season 1
-                cast = copy.deepcopy(season.cast)
-                credits = copy.deepcopy(season.credits)
-                airdate = copy.deepcopy(season.airdate)
+                cast = list(season.cast)
+                credits = list(season.credits)
+                airdate = season.airdate
 
-            seasons.append(season)
+            append_season(season)
         
         return Anime(
             id='T' + str(show_id), 
@@ -1,15 +1,15 @@
 import logging
-import pathlib
-import json
+import orjson
+import time
 
 import requests
 
 from amc2_api.model import Title, TitleEntry, TitleRepo
 from amc2_api.model import Episode, Anime, AnimeEntry, AnimeRepo, TmdbSeasonId
 from amc2_api.persistence import Persisted, PersistedStat, ObjectNotFound, ObjectStore, WriteNotSupported, FileObjectStore, HTTPObjectStore, object_store_factory
-from amc2_api.utils import URL, Throttler, parse_mime
+from amc2_api.utils import URL, parse_mime
 
-from .parse import iter_collection, AnimeTmdbJsonParser
+from .parse import AnimeTmdbJsonParser
 
 
 from typing import List, Optional, Dict, Union, Tuple, Protocol, Any, Iterator
@@ -17,6 +17,20 @@ from typing import List, Optional, Dict, Union, Tuple, Protocol, Any, Iterator
 _logger = logging.getLogger(__name__)
 
 
+def _add_json_item(obj: bytes, key: str, value: bytes) -> bytes:
+    """
+    Appends the encoded value to the encoded JSON object. 
+    The key must not be present yet, else the object contains it twice.
+    """
+    head = obj.rstrip()[:-1].rstrip()
+    sep = b'' if head.endswith(b'{') else b','
+    return head + sep + orjson.dumps(key) + b':' + value + b'}'
+
+
+def _json_array(items: List[bytes]) -> bytes:
+    return b'[' + b','.join(items) + b']'
+
+
 class TmdbApiShowStore(HTTPObjectStore):
     """
     Base URL should be ``https://api.themoviedb.org/3`` or an equivalent.
@@ -35,21 +49,22 @@ class TmdbApiShowStore(HTTPObjectStore):
         super().__init__(req_interval=0.25, err_interval=15*60)
 
     def _parse_name(self, name: str) -> URL:
-        path = pathlib.PurePath(name)
-        lang = path.parts[0]
+        lang = name.split('/', 1)[0]
 
         if lang not in self.languages:
             raise ObjectNotFound(f"Invalid language '{lang}', expected {self.languages}")
 
-        if path.suffix.lower() != '.json':
-            raise ObjectNotFound(f"Not a json file, ends with '{path.suffix}'")
-        tid = path.stem
+        tid, _, suffix = name.rsplit('/', 1)[-1].rpartition('.')
+        if not tid or suffix.lower() != 'json':
+            raise ObjectNotFound(f"Not a json file '{name}'")
 
         url = URL(self.base_url).joinpath('tv', tid)
 
         url.query['api_key'] = self.api_key
         if lang != 'en':
             url.query['language'] = lang
+        # encode the query again, the copies per API request then copy the string
+        url.query_string = url.query_string
         
         return url
     
@@ -62,45 +77,78 @@ class TmdbApiShowStore(HTTPObjectStore):
     
     def _api_json(self, url: URL, subpath: str) -> Any:
         try:
-            return self._api_fetch(url, subpath).json()
-        except requests.JSONDecodeError:
+            return orjson.loads(self._api_fetch(url, subpath).content)
+        except orjson.JSONDecodeError:
+            raise ObjectNotFound(f"Error decoding API JSON, URL {url}")
+
+    def _api_json_bytes(self, url: URL, subpath: str) -> bytes:
+        # for the bodies only passed through, they are validated but not dumped again,
+        # a malformed body must not end up in the persisted document
+        data = self._api_fetch(url, subpath).content.strip()
+        try:
+            obj = orjson.loads(data)
+        except orjson.JSONDecodeError:
             raise ObjectNotFound(f"Error decoding API JSON, URL {url}")
+        if not isinstance(obj, dict):
+            raise ObjectNotFound(f"Expected a JSON object from API, URL {url}")
+        return data
     
-    def _api_images(self, url: URL, base: str) -> Any:
+    def _api_images(self, url: URL, base: str) -> bytes:
         # also query images without language, in english and japanese
         url = url.with_qs(include_image_language='en,null,ja')
         base = base.rstrip('/')
         subpath = base + '/images' if base else 'images'
-        return self._api_json(url, subpath)
+        return self._api_json_bytes(url, subpath)
     
     def stat(self, name: str) -> PersistedStat:
         # Don't actually reach out to the API. By definition always fresh.
         return PersistedStat(content_type='text/json')
 
+    def _fetch_season(self, url: URL, season: Any) -> bytes:
+        if (sid := season.get('season_number')) is None:
+            return orjson.dumps(season)
+
+        season_base = f'season/{sid}'
+        full_season = self._api_json(url, season_base)
+        images = self._api_images(url, season_base)
+        credits = self._api_json_bytes(url, season_base + '/aggregate_credits')
+        
+        data = orjson.dumps({k: v for k, v in full_season.items() if k not in ('images', 'credits', 'episodes')})
+        data = _add_json_item(data, 'images', images)
+        data = _add_json_item(data, 'credits', credits)
+        if 'episodes' in full_season:
+            episodes = [self._fetch_episode(url, season_base, e) for e in full_season['episodes']]
+            data = _add_json_item(data, 'episodes', _json_array(episodes))
+        return data
+
+    def _fetch_episode(self, url: URL, season_base: str, episode: Any) -> bytes:
+        if (eid := episode.get('episode_number')) is None:
+            return orjson.dumps(episode)
+
+        episode_base = season_base + f'/episode/{eid}'
+        full_episode = self._api_json(url, episode_base)
+        images = self._api_images(url, episode_base)
+
+        data = orjson.dumps({k: v for k, v in full_episode.items() if k != 'images'})
+        return _add_json_item(data, 'images', images)
+
     def get(self, name: str) -> Persisted:
         try:
             url = self._parse_name(name)
 
+            # the show, season and episode objects are dumped again without 
+            # the keys spliced in, the other responses are spliced into the 
+            # document as they are
             main = self._api_json(url, '')
-            main['images'] = self._api_images(url, '')
-            main['alternative_titles'] = self._api_json(url, 'alternative_titles')
-
-            for season, sid in iter_collection(main, 'seasons', 'season_number'):
-                season_base = f'season/{sid}'
-                full_season = self._api_json(url, season_base)
-                season.clear()
-                season.update(full_season)
-                season['images'] = self._api_images(url, season_base)
-                season['credits'] = self._api_json(url, season_base + '/aggregate_credits')
-
-                for episode, eid in iter_collection(season, 'episodes', 'episode_number'):
-                    episode_base = season_base + f'/episode/{eid}'
-                    full_episode = self._api_json(url, episode_base)
-                    episode.clear()
-                    episode.update(full_episode)
-                    episode['images'] = self._api_images(url, episode_base)
-
-            data = json.dumps(main).encode()
+            images = self._api_images(url, '')
+            alt_titles = self._api_json_bytes(url, 'alternative_titles')
+
+            data = orjson.dumps({k: v for k, v in main.items() if k not in ('images', 'alternative_titles', 'seasons')})
+            data = _add_json_item(data, 'images', images)
+            data = _add_json_item(data, 'alternative_titles', alt_titles)
+            if 'seasons' in main:
+                seasons = [self._fetch_season(url, s) for s in main['seasons']]
+                data = _add_json_item(data, 'seasons', _json_array(seasons))
             return Persisted(content_type='text/json', data=data)
         except ObjectNotFound as e:
             e.object_name = name
@@ -131,15 +179,23 @@ class TmdbApiImageStore(HTTPObjectStore):
     """
 
     user_agent = 'animemetacache'
+    # images are the biggest objects, read them in one go
+    stream_content = True
+    # images rarely change, revalidate them instead of downloading them again
+    conditional_get = True
+
+    # the /configuration is refreshed after this many seconds
+    config_ttl: float = 60*60*24*2
 
     _api_url: URL
     _base_url: Optional[URL]
-    _config_throttler: Throttler
+    # monotonic time after which the base url is fetched again
+    _base_url_expires: float
 
     def __init__(self, api_url: Union[URL, str]) -> None:
         self._api_url = URL(api_url)
         self._base_url = None
-        self._config_throttler = Throttler(60*60*24*2)
+        self._base_url_expires = 0.0
         super().__init__(req_interval=4, err_interval=30*60)
 
     def _fetch_config(self) -> Any:
@@ -149,9 +205,9 @@ class TmdbApiImageStore(HTTPObjectStore):
         return resp.json()
 
     def _make_url(self, name: str, stat: bool) -> str:
-        if self._base_url is None or self._config_throttler.check():
+        if self._base_url is None or time.monotonic() > self._base_url_expires:
             self._base_url = URL(self._fetch_config()['images']['secure_base_url'])
-            self._config_throttler.mark()
+            self._base_url_expires = time.monotonic() + self.config_ttl
         url = self._base_url.joinpath('original', name.strip('/'))
         return str(url)
 
@@ -179,12 +235,12 @@ class PersistedTmdbAnimeRepo:
             raise RuntimeError(f"Expected json mime-type, got {json_obj.content_type}")
         
         try:
-            data = json_obj.data.decode()
+            # orjson decodes the UTF-8 itself
             anime = AnimeTmdbJsonParser.parse(
-                data, 
+                json_obj.data, 
                 lang='en'
             )
-        except (UnicodeError, ValueError) as e:
+        except ValueError as e:
             raise RuntimeError(str(e))
         
         if anime is not None:
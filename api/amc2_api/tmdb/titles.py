@@ -6,10 +6,12 @@ import datetime
 from amc2_api.model import Title, TitleEntry, TmdbSeasonId
 from amc2_api.utils import URL, Throttler
 
-from typing import Union, List, Any, Tuple
+from typing import Union, List, Any, Tuple, Sequence, Dict
 
 _logger = logging.getLogger(__name__)
 
+_RE_GENERIC_SEASON_NAME = re.compile(r'season\s+([0-9]+)', re.I)
+
 
 class TmdbApiTitleRepo:
     """
@@ -62,7 +64,7 @@ class TmdbApiTitleRepo:
         return resp.json()
     
     def _is_generic_name(self, name: str, num: int = -1) -> bool:
-        if (m := re.match(r'season\s+([0-9]+)', name.strip(), re.I)) is not None:
+        if (m := _RE_GENERIC_SEASON_NAME.match(name.strip())) is not None:
             parsed_num = int(m.group(1))
             return True if num < 0 else num == parsed_num
         return False
@@ -78,6 +80,7 @@ class TmdbApiTitleRepo:
         seasons = [s for s in seasons if not self._is_specials_name(s[0])]
 
         entries: List[TitleEntry] = []
+        age = datetime.datetime.now(tz=datetime.timezone.utc)
         for s_name, s_num in seasons:
             if self._is_generic_name(s_name, num=1):
                 title = show_name
@@ -86,9 +89,9 @@ class TmdbApiTitleRepo:
             else:
                 title = s_name
 
-            t = Title(value=title, aid=str(TmdbSeasonId((show_id, s_num))))
-            age = datetime.datetime.now(tz=datetime.timezone.utc)
-            entries.append(TitleEntry(title=t, age=age))
+            # all values are plain strings already, skip the validation
+            t = Title.trusted(title, TmdbSeasonId.format(show_id, s_num), '', '')
+            entries.append(TitleEntry.trusted(t, age))
         return entries
         
     def find(self, title: Title) -> List[TitleEntry]:
@@ -106,8 +109,34 @@ class TmdbApiTitleRepo:
         
         return entries
 
+    def exists(self, title: Title, exclude_types: Sequence[str] = ()) -> bool:
+        return any(e.title.type not in exclude_types for e in self.find(title))
+
+    def find_by_aids(self, aids: Sequence[str]) -> Dict[str, List[TitleEntry]]:
+        # the seasons of a show are all returned by one API request
+        show_ids: Dict[int, None] = {}
+        for aid in aids:
+            try:
+                show_ids[TmdbSeasonId(aid).tvshow] = None
+            except ValueError:
+                continue
+
+        wanted = set(aids)
+        result: Dict[str, List[TitleEntry]] = {}
+        for tid in show_ids:
+            show = self._get_show(tid)
+            if show is None:
+                continue
+            for entry in self._handle_tvshow(show):
+                if entry.title.aid in wanted:
+                    result.setdefault(entry.title.aid, []).append(entry)
+        return result
+
     def store(self, title: TitleEntry) -> None:
         raise NotImplementedError()
+
+    def store_many(self, titles: List[TitleEntry]) -> None:
+        raise NotImplementedError()
     
     def purge(self) -> None:
         raise NotImplementedError()
@@ -3,6 +3,8 @@ import datetime
 import threading
 import urllib.parse
 import pathlib
+import re
+import functools
 
 from typing import Union, Tuple, Dict, Optional, List
 
@@ -17,14 +19,14 @@ __all__ = [
 class Throttler:
     _time: Optional[float]
     _interval: float
-    _lock: threading.RLock
+    _lock: threading.Lock
 
     def __init__(self, interval: float) -> None:
         if interval <= 0:
             raise ValueError("Throttle interval must be strictly positive")
         self._time = None
         self._interval = float(interval)
-        self._lock = threading.RLock()
+        self._lock = threading.Lock()
     
     @property
     def interval(self) -> float:
@@ -49,46 +51,56 @@ class Throttler:
 
     # use the wait method between two calls when accessing the API
     def wait(self):
-        if self._time is None:
-            return
         with self._lock:
-            delta = time.monotonic() - self._time
-            if delta < self._interval:
-                # sleep while holding the lock to make sure the execution is serialized
-                time.sleep(delta)
-                # the next one getting the lock needs to wait the full time
-                self.mark()
+            if self._time is not None:
+                remaining = self._interval - (time.monotonic() - self._time)
+                if remaining > 0:
+                    # sleep while holding the lock to make sure the execution is serialized
+                    time.sleep(remaining)
+            # the next one getting the lock needs to wait the full time
+            self.mark()
 
 
+# only a handful of distinct content types ever show up
+@functools.lru_cache(maxsize=64)
 def parse_mime(value: str) -> Tuple[str, str, str]:
-    x = value.split(';')
-    y = x[0].split('/')
-    return (y[0], y[1], x[1] if len(x) > 1 else '')
+    head, _, params = value.partition(';')
+    major, _, minor = head.partition('/')
+    return (major, minor, params)
+
+
+_RE_TIMEDELTA_TOKEN = re.compile(r'\d+|[^\d\s]+')
 
 
 class URL:
     """
     Does not support multiple values for a key. While allowed in URLs, it is 
     not used very often and makes implementation/use too complicated.
+
+    The query string is only parsed when the ``query`` dict is accessed, 
+    until then it is kept and copied as it is. with_qs() appends new keys 
+    to the unparsed query string.
     """
 
     scheme: str
     netloc = str
     path: str
     params: str
-    query: Dict[str, str]
     fragment: str
     username: Optional[str]
     password: Optional[str]
     hostname: Optional[str]
     port: Optional[int]
+    _query: Optional[Dict[str, str]]
+    _query_raw: str
 
     def __init__(self, url: Union[str, 'URL']) -> None:
         if isinstance(url, URL):
             self.scheme = url.scheme
             self.path = url.path
             self.params = url.params
-            self.query_string = url.query_string
+            self._query_raw = url._query_raw
+            self._query = dict(url._query) if url._query is not None else None
             self.fragment = url.fragment
             self.username = url.username
             self.password = url.password
@@ -128,20 +140,39 @@ class URL:
         host = self.hostname if self.hostname else ''
         return userinfo + host + port
     
+    @property
+    def query(self) -> Dict[str, str]:
+        if self._query is None:
+            q = urllib.parse.parse_qs(self._query_raw)
+            self._query = {k: vl[0] for k, vl in q.items() if vl}
+        return self._query
+    
+    @query.setter
+    def query(self, value: Dict[str, str]) -> None:
+        self._query = value
+
     @property
     def query_string(self) -> str:
-        return urllib.parse.urlencode(self.query)
+        # once parsed, the dict may have been modified
+        if self._query is None:
+            return self._query_raw
+        return urllib.parse.urlencode(self._query)
     
     @query_string.setter
     def query_string(self, value: str) -> None:
-        q = urllib.parse.parse_qs(value)
-        self.query = {k: vl[0] for k, vl in q.items() if vl}
+        self._query_raw = value
+        self._query = None
     
     def path_parts(self) -> List[str]:
         return list(pathlib.PurePath(self.path).parts)
 
     def append_path(self, *parts: str) -> None:
-        self.path = str(pathlib.PurePath(self.path).joinpath(*parts))
+        # joins like PurePosixPath.joinpath(), without building the path objects
+        path = self.path
+        for part in parts:
+            path = part if part.startswith('/') or not path else path + '/' + part
+        segments = [seg for seg in path.split('/') if seg and seg != '.']
+        self.path = ('/' if path.startswith('/') else '') + '/'.join(segments)
 
     def joinpath(self, *parts: str) -> 'URL':
         url = URL(self)
@@ -150,7 +181,12 @@ class URL:
     
     def with_qs(self, **qs: str) -> 'URL':
         url = URL(self)
-        url.query.update(qs)
+        if url._query is None and not any(k in url._query_raw for k in qs):
+            # new keys only, append them without parsing the query into a dict
+            extra = urllib.parse.urlencode(qs)
+            url._query_raw = url._query_raw + '&' + extra if url._query_raw else extra
+        else:
+            url.query.update(qs)
         return url
 
     def __str__(self) -> str:
@@ -159,11 +195,9 @@ class URL:
 
 
 class TimedeltaParser:
-    whitespace: List[str]
     factors: Dict[str, int]
 
     def __init__(self):
-        self.whitespace = [' ', '\n', '\t']
         self.factors = {
             's': 1, 
             'min': 60, 
@@ -175,26 +209,8 @@ class TimedeltaParser:
         }
 
     def tokenize(self, value: str) -> List[str]:
-        value = value.lower()
-        tokens: List[str] = []
-        old_st = 0
-        
-        for c in value:
-            if c.isdecimal():
-                new_st = 1
-            elif c in self.whitespace:
-                new_st = 0
-            else:
-                new_st = 2
-            
-            if not tokens or (new_st != old_st and old_st != 0):
-                tokens.append('')
-
-            if new_st != 0:
-                tokens[-1] += c
-            old_st = new_st
-    
-        return tokens
+        # digits and runs of anything else, whitespace only separates tokens
+        return _RE_TIMEDELTA_TOKEN.findall(value.lower())
     
     def parse(self, tokens: List[str]) -> int:
         seconds = 0
@@ -212,6 +228,9 @@ class TimedeltaParser:
                     raise ValueError(f"Expected one of {choices}, got '{tok}'")
                 seconds += self.factors[tok] * num
 
+        # a number without unit counts as seconds, like a plain int setting
+        if len(tokens) % 2 == 1:
+            seconds += num
         return seconds
 
     
@@ -2,7 +2,6 @@
 import xbmcplugin, xbmcgui, xbmc, xbmcaddon # type: ignore
 import json
 import datetime
-import time
 import re
 
 from typing import Dict, Any, List, Tuple, Union, Optional
@@ -10,17 +9,7 @@ from typing import Dict, Any, List, Tuple, Union, Optional
 from utils import URL
 
 from tvscraper_common import api_get_anime, api_make_request, parse_episode_url
-from tvscraper_common import Config, find_title, filter_castrole, filter_writers, find_by_number
-
-
-# https://kodi.wiki/view/Python_Problems
-# monkeymatch datetime
-# TypeError: 'NoneType' object is not callable
-class proxydt(datetime.datetime):
-    @classmethod
-    def strptime(cls, date_string, format):
-        return datetime.datetime(*(time.strptime(date_string, format)[:6]))
-datetime.datetime = proxydt
+from tvscraper_common import Config, find_title, filter_castrole, filter_writers, find_by_number, get_uniqueids
 
 
 def log(msg, level=xbmc.LOGDEBUG):
@@ -29,6 +18,8 @@ def log(msg, level=xbmc.LOGDEBUG):
 
 def set_listitem_images(liz: Any, images: Any) -> None:
     fanart: List[Dict[str, str]] = []
+    # shows can have hundreds of images
+    add_artwork = liz.addAvailableArtwork
 
     for image in images:
         img_url = image['_links']['image']['href']
@@ -37,18 +28,20 @@ def set_listitem_images(liz: Any, images: Any) -> None:
         if img_type == 'backdrop':
             fanart.append({'image': img_url})
         elif img_type in ('poster', 'banner', 'thumb'):
-            liz.addAvailableArtwork(img_url, img_type)
+            add_artwork(img_url, img_type)
     
     liz.setAvailableFanart(fanart)
 
 
 def set_listitem_ratings(liz: Any, ratings: Any, default_source: str = '') -> None:
+    set_rating = liz.setRating
     for rating in ratings:
-        liz.setRating(
-            rating['source'], 
+        source = rating['source']
+        set_rating(
+            source, 
             rating['average'], 
             votes = rating['votes'], 
-            defaultt = (rating['source'] == default_source)
+            defaultt = (source == default_source)
         )
 
 
@@ -82,14 +75,15 @@ def plugin_getdetails(config: Config) -> None:
 
     anime = api_get_anime(config, anime_id)
 
-    uniqueids = {str(k): str(v) for k, v in anime['uniqueids'].items()}
-    uniqueids['amc2'] = anime['id']
+    uniqueids = get_uniqueids(anime)
 
     title = find_title(anime['titles'], lang=config.language, use_main=False)
 
-    airdate: Optional[datetime.datetime] = None
+    airdate: Optional[datetime.date] = None
     if 'airdate' in anime and anime['airdate']:
-        airdate = datetime.datetime.strptime(anime['airdate'], '%Y-%m-%d')
+        # the API sends ISO dates, this also avoids datetime.strptime(), 
+        # which is broken in embedded interpreters (https://kodi.wiki/view/Python_Problems)
+        airdate = datetime.date.fromisoformat(anime['airdate'])
 
     info = {
         'mediatype': 'tvshow',
@@ -108,7 +102,7 @@ def plugin_getdetails(config: Config) -> None:
 
     if airdate:
         info['year'] = str(airdate.year)
-        info['premiered'] = airdate.date().isoformat()
+        info['premiered'] = airdate.isoformat()
 
     liz = xbmcgui.ListItem(title, offscreen=True)
     liz.setInfo('video', info)
@@ -119,8 +113,9 @@ def plugin_getdetails(config: Config) -> None:
     set_listitem_images(liz, anime['images'])
     set_listitem_ratings(liz, anime['ratings'], config.default_rating_source)
 
+    lang = config.language
     for season in anime['seasons']:
-        title = find_title(season['titles'], lang=config.language, use_main=False)
+        title = find_title(season['titles'], lang=lang, use_main=False)
         liz.addSeason(season['number'], title)
     
     xbmcplugin.setResolvedUrl(handle=config.plugin_handle, succeeded=True, listitem=liz)
@@ -134,27 +129,31 @@ def plugin_getepisodelist(config: Config) -> None:
     anime_url = config.api_base_url.joinpath('anime', anime_id)
     anime = api_get_anime(config, anime_id)
 
+    handle = config.plugin_handle
+    lang = config.language
+    add_item = xbmcplugin.addDirectoryItem
+    # setInfo() copies the values, the dict is reused for all episodes
+    info: Dict[str, Any] = {}
+
     for season in anime['seasons']:
         s_num = int(season['number'])
+        info['season'] = s_num
         for episode in season['episodes']:
             ep_num = int(episode['number'])
 
-            title = find_title(episode['titles'], lang=config.language)
+            title = find_title(episode['titles'], lang=lang)
 
-            info = {
-                'title': title,
-                'season': s_num,
-                'episode': ep_num,
-                'aired': episode['airdate'],
-            }
+            info['title'] = title
+            info['episode'] = ep_num
+            info['aired'] = episode['airdate']
 
             liz=xbmcgui.ListItem(title, offscreen=True)
             liz.setInfo('video', info)
 
             url = anime_url.joinpath('seasons', str(s_num), 'episodes', str(ep_num))
 
-            xbmcplugin.addDirectoryItem(
-                handle=config.plugin_handle, 
+            add_item(
+                handle=handle, 
                 url=str(url), 
                 listitem=liz, 
                 isFolder=False
@@ -217,24 +216,33 @@ def plugin_getartwork(config: Config) -> None:
 
 
 
-def parse_nfo(nfo: str) -> str:
-    regexes = [
-        r'\s*A(?P<anidb>[0-9]+)-T(?P<tmdb>[0-9]+)S(?P<tmdb_s>[0-9]+)\s*',
-        r'\s*A(?P<anidb>[0-9]+)\s*',
-        r'\s*T(?P<anidb>[0-9]+)\s*',
-        r'\s*https?://anidb\.net/\.*aid=(?P<anidb>[0-9]+)\s*',
-        r'\s*https?://www\.themoviedb\.org/tv/(?P<tmdb>[0-9]+)(?:[^/]*)/season/(?P<tmdb_s>[0-9]+).*\s*',
-        r'\s*https?://www\.themoviedb\.org/tv/(?P<tmdb>[0-9]+)[^0-9]*.*\s*',
-    ]
+# one pattern matched at the start of each nfo line, the ids of later lines override the earlier
+_NFO_RE = re.compile(
+    r'\s*(?:'
+    r'A(?P<anidb>[0-9]+)(?:-T(?P<mapping_tmdb>[0-9]+)S(?P<mapping_tmdb_s>[0-9]+))?'
+    r'|(?:T|https?://anidb\.net/\.*aid=)(?P<anidb_alt>[0-9]+)'
+    r'|https?://www\.themoviedb\.org/tv/(?P<tmdb>[0-9]+)(?:[^/]*/season/(?P<tmdb_s>[0-9]+))?'
+    r')'
+)
+# group names are unique per pattern, the alternatives capture the same ids
+_NFO_GROUP_IDS = {
+    'anidb': 'anidb',
+    'anidb_alt': 'anidb',
+    'mapping_tmdb': 'tmdb',
+    'mapping_tmdb_s': 'tmdb_s',
+    'tmdb': 'tmdb',
+    'tmdb_s': 'tmdb_s',
+}
+
 
+def parse_nfo(nfo: str) -> str:
     ids = {}
     for line in nfo.splitlines():
         if line.startswith('#'):
             continue
-        for reg in regexes:
-            m = re.match(reg, line)
-            if m:
-                ids.update({k: v for k,v in m.groupdict('').items() if v})
+        m = _NFO_RE.match(line)
+        if m:
+            ids.update({_NFO_GROUP_IDS[k]: v for k,v in m.groupdict('').items() if v})
 
     anidb = ids.get('anidb', '')
     tmdb = ids.get('tmdb', '')
@@ -263,8 +271,7 @@ def plugin_nfourl(config: Config) -> None:
 
         title = find_title(anime['titles'], lang=config.language, use_main=False)
 
-        uniqueids = {str(k): str(v) for k, v in anime['uniqueids'].items()}
-        uniqueids['amc2'] = anime['id']
+        uniqueids = get_uniqueids(anime)
 
         liz = xbmcgui.ListItem(title, offscreen=True)
         liz.setUniqueIDs(uniqueids, 'amc2')
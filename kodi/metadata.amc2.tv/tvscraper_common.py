@@ -1,12 +1,20 @@
 # -*- coding: UTF-8 -*-
-import xbmcplugin, xbmcgui, xbmc, xbmcaddon # type: ignore
+import xbmcplugin, xbmcgui, xbmc, xbmcaddon, xbmcvfs # type: ignore
 import requests
 import functools
 import json
+import pathlib
 
 from typing import Dict, Optional, Any, cast, List, Tuple, Union
 
-from utils import URL, get_plugin_params, get_plugin_handle
+from utils import URL, ResponseCache, get_plugin_params, get_plugin_handle
+
+try:
+    # there is no kodi addon for it, but the system python of kodi may have it
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 
 class ConfigError(Exception):
@@ -17,11 +25,13 @@ class Config:
     _addon: Any
     _params: Dict[str, str]
     _instance_settings: Dict[str, str]
+    _response_cache: Optional[ResponseCache]
 
     def __init__(self) -> None:
         self._addon = xbmcaddon.Addon()
         self._params = {}
         self._instance_settings = {}
+        self._response_cache = None
 
     def _get_main(self, name: str) -> str:
         return str(self._addon.getSetting(name))
@@ -48,6 +58,13 @@ class Config:
         return get_plugin_handle()
 
     @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            profile = xbmcvfs.translatePath(self._addon.getAddonInfo('profile'))
+            self._response_cache = ResponseCache(pathlib.Path(profile, 'responses.sqlite'))
+        return self._response_cache
+
+    @functools.cached_property
     def api_base_url(self) -> URL:
         url = self._get_instance('api_base_url')
         if not url:
@@ -58,43 +75,57 @@ class Config:
         except ValueError:
             raise ConfigError("The API base url is not a valid URL") from None
     
-    @property
+    @functools.cached_property
     def language(self) -> str:
         # TODO
         return 'en'
 
-    @property
+    @functools.cached_property
     def default_rating_source(self) -> str:
         # TODO
         return 'anidb'
     
-    @property
+    @functools.cached_property
     def cast_picture_is_character(self) -> bool:
         # TODO
         return False
 
 
+# shared by all requests, keeps the connection to the API open between them
+# (also across plugin calls when kodi reuses the language invoker)
+_session = requests.Session()
+_session.headers['User-Agent'] = 'Amc2KodiScraper'
+
+
 def api_make_request(
     method: str, 
     url: Union[str, URL],
     json: Optional[Dict[Any, Any]] = None
 ) -> Any:
-    headers = {
-        'User-Agent': 'Amc2KodiScraper'
-    }
-    res = requests.request(method, str(url), headers=headers, json=json)
+    res = _session.request(method, str(url), json=json)
+    res.raise_for_status()
+    return json_loads(res.content)
+
+
+def api_get_bytes(url: Union[str, URL]) -> bytes:
+    res = _session.get(str(url))
     res.raise_for_status()
-    return res.json()
+    return res.content
 
 
 @functools.lru_cache
-def api_get_json(url: str) -> Any:
-    return api_make_request('GET',url)
+def api_get_json(url: str, cache: Optional[ResponseCache] = None) -> Any:
+    data = cache.get(url) if cache is not None else None
+    if data is None:
+        data = api_get_bytes(url)
+        if cache is not None:
+            cache.put(url, data)
+    return json_loads(data)
 
 
 def api_get_anime(config: Config, anime_id: str) -> Any:
     anime_url = config.api_base_url.joinpath('anime', anime_id)
-    return api_get_json(str(anime_url))
+    return api_get_json(str(anime_url), config.response_cache)
 
 
 def parse_episode_url(url: Union[str, URL]) -> Tuple[str, int, int]:
@@ -122,57 +153,80 @@ def parse_episode_url(url: Union[str, URL]) -> Tuple[str, int, int]:
 
 
 def find_title(titles: Any, lang: str = 'en', use_main: bool = False) -> str:
-    main = [t for t in titles if t['type'] == 'main']
-    if main and use_main:
-        return main[0]['title']
+    # one pass, called for every episode of a show
+    main = official = by_lang = no_lang = None
+    for t in titles:
+        t_type = t['type']
+        if t_type == 'main':
+            if use_main:
+                return t['title']
+            if main is None:
+                main = t
+
+        t_lang = t['lang']
+        if t_lang == lang:
+            if t_type == 'official':
+                if not use_main:
+                    return t['title']
+                if official is None:
+                    official = t
+            elif by_lang is None:
+                by_lang = t
+        elif t_lang == '' and no_lang is None:
+            no_lang = t
+
+    # preferred first, then the fallbacks
+    for t in (official, by_lang, main, no_lang):
+        if t is not None:
+            return t['title']
+    return titles[0]['title']
 
-    by_lang = [t for t in titles if t['lang'] == lang]
-    official = [t for t in by_lang if t['type'] == 'official']
 
-    if official:
-        return official[0]['title']
-    elif by_lang:
-        return by_lang[0]['title']
-    
-    # fallbacks
-    no_lang = [t for t in titles if t['lang'] == '']
-    if main:
-        return main[0]['title']
-    if no_lang:
-        return no_lang[0]['title']
-    return titles[0]['title']
+def get_uniqueids(anime: Any) -> Dict[str, str]:
+    # json keys are str already, only the ids may be numbers
+    uniqueids = {k: v if isinstance(v, str) else str(v) for k, v in anime['uniqueids'].items()}
+    uniqueids['amc2'] = anime['id']
+    return uniqueids
+
+
+# id(items) -> (items, number -> item), the list is kept so its id isn't reused meanwhile
+_number_indexes: Dict[int, Tuple[Any, Dict[int, Any]]] = {}
+_number_indexes_maxsize = 256
+
+
+def _index_by_number(items: Any) -> Dict[int, Any]:
+    entry = _number_indexes.get(id(items))
+    if entry is None or entry[0] is not items:
+        # reversed: the first item of a number wins, like the linear search did
+        entry = (items, {item['number']: item for item in reversed(items)})
+        _number_indexes[id(items)] = entry
+        if len(_number_indexes) > _number_indexes_maxsize:
+            del _number_indexes[next(iter(_number_indexes))]
+    return entry[1]
 
 
 def find_by_number(items: Any, number: int) -> Optional[Any]:
-    for item in items:
-        if item['number'] == number:
-            return item
-    return None
+    # the anime documents are cached by api_get_json(), when kodi reuses the 
+    # interpreter, the episodes of a show are looked up in the same lists
+    return _index_by_number(items).get(number)
 
 
 def filter_castrole(config: Config, cast: Any) -> List[Dict[str, str]]:
     result: List[Dict[str, str]] = []
+    image_key = 'character_image' if config.cast_picture_is_character else 'actor_image'
     for role in cast:
         item = {
             'name': role['actor'], 
             'role': role['character']
         }
 
-        actor_img = role.get('actor_image', None)
-        char_img = role.get('character_image', None)
-
-        if actor_img is not None and not config.cast_picture_is_character:
-            item['thumbnail'] = actor_img['_links']['image']['href']
-        elif char_img is not None and config.cast_picture_is_character:
-            item['thumbnail'] = char_img['_links']['image']['href']
+        img = role.get(image_key, None)
+        if img is not None:
+            item['thumbnail'] = img['_links']['image']['href']
 
         result.append(item)
     return result
 
 
 def filter_writers(config: Config, credits: Any) -> List[str]:
-    result: str = []
-    for credit in credits:
-        if credit['category'].lower() == 'writing':
-            result.append(credit['name'])
-    return result
+    return [credit['name'] for credit in credits if credit['category'].lower() == 'writing']
@@ -1,7 +1,10 @@
 # -*- coding: UTF-8 -*-
+import functools
 import urllib.parse
 import pathlib
+import sqlite3
 import sys
+import time
 
 from typing import Dict, Optional, Any, List, Tuple, Union
 
@@ -9,8 +12,8 @@ from typing import Dict, Optional, Any, List, Tuple, Union
 def get_plugin_params(argv: Optional[List[str]] = None) -> Dict[str, str]:
     argv = argv if argv else sys.argv
     qs = argv[2].lstrip('?')
-    q = urllib.parse.parse_qs(qs)
-    return {k: vl[0] for k, vl in q.items() if vl}
+    # reversed: the first value of a repeated key wins, as with parse_qs()
+    return dict(reversed(urllib.parse.parse_qsl(qs)))
 
 
 def get_plugin_handle(argv: Optional[List[str]] = None) -> int:
@@ -18,9 +21,19 @@ def get_plugin_handle(argv: Optional[List[str]] = None) -> int:
     return int(sys.argv[1])
 
 
+@functools.lru_cache(maxsize=256)
+def _parse_url(url: str) -> Tuple[str, str, str, Tuple[Tuple[str, str], ...], str, Optional[str], Optional[str], Optional[str], Optional[int]]:
+    # the api base url is parsed for every request otherwise
+    tup = urllib.parse.urlparse(url)
+    q = urllib.parse.parse_qs(tup.query)
+    query = tuple((k, vl[0]) for k, vl in q.items() if vl)
+    return (tup.scheme, tup.path, tup.params, query, tup.fragment, tup.username, tup.password, tup.hostname, tup.port)
+
+
 class URL:
+    __slots__ = ('scheme', 'path', 'params', 'query', 'fragment', 'username', 'password', 'hostname', 'port')
+
     scheme: str
-    netloc = str
     path: str
     params: str
     query: Dict[str, str]
@@ -35,23 +48,23 @@ class URL:
             self.scheme = url.scheme
             self.path = url.path
             self.params = url.params
-            self.query_string = url.query_string
+            self.query = dict(url.query)
             self.fragment = url.fragment
             self.username = url.username
             self.password = url.password
             self.hostname = url.hostname
             self.port = url.port
         else:
-            tup = urllib.parse.urlparse(url)
-            self.scheme = tup.scheme
-            self.path = tup.path
-            self.params = tup.params
-            self.query_string = tup.query
-            self.fragment = tup.fragment
-            self.username = tup.username
-            self.password = tup.password
-            self.hostname = tup.hostname
-            self.port = tup.port
+            scheme, path, params, query, fragment, username, password, hostname, port = _parse_url(url)
+            self.scheme = scheme
+            self.path = path
+            self.params = params
+            self.query = dict(query)
+            self.fragment = fragment
+            self.username = username
+            self.password = password
+            self.hostname = hostname
+            self.port = port
     
     def copy(self) -> 'URL':
         return URL(self)
@@ -85,10 +98,17 @@ class URL:
         self.query = {k: vl[0] for k, vl in q.items() if vl}
 
     def path_parts(self) -> List[str]:
-        return list(pathlib.PurePath(self.path).parts)
+        # like PurePosixPath.parts, a leading '/' is the first part
+        parts = [seg for seg in self.path.split('/') if seg and seg != '.']
+        return ['/'] + parts if self.path.startswith('/') else parts
 
     def append_path(self, *parts: str) -> None:
-        self.path = str(pathlib.PurePath(self.path).joinpath(*parts))
+        # joins like PurePosixPath.joinpath(), without building the path objects
+        path = self.path
+        for part in parts:
+            path = part if part.startswith('/') or not path else path + '/' + part
+        segments = [seg for seg in path.split('/') if seg and seg != '.']
+        self.path = ('/' if path.startswith('/') else '') + '/'.join(segments)
 
     def joinpath(self, *parts: str) -> 'URL':
         url = URL(self)
@@ -104,3 +124,54 @@ class URL:
         tup = (self.scheme, self.netloc, self.path, self.params, self.query_string, self.fragment)
         return urllib.parse.urlunparse(tup)
 
+
+
+class ResponseCache:
+    """
+    Keeps API response bodies in a sqlite database for ``ttl`` seconds.
+    Kodi starts the scraper for every episode of a show, thus the anime 
+    document is requested again and again during a library scan.
+
+    The cache is best effort, database errors are treated as a miss.
+    """
+
+    ttl: float
+    path: pathlib.Path
+    _db: Optional[sqlite3.Connection]
+
+    def __init__(self, path: Union[str, pathlib.Path], ttl: float = 60*60) -> None:
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=5)
+            with db:
+                db.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body BLOB, ts REAL)")
+                # drop the expired entries once per process, they are never read again
+                db.execute("DELETE FROM responses WHERE ts < ?", (time.time() - self.ttl,))
+            self._db = db
+        return self._db
+
+    def get(self, url: str) -> Optional[bytes]:
+        try:
+            row = self._connect().execute(
+                "SELECT body FROM responses WHERE url = ? AND ts >= ?", 
+                (url, time.time() - self.ttl)
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+        return bytes(row[0]) if row is not None else None
+
+    def put(self, url: str, body: bytes) -> None:
+        try:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (url, body, ts) VALUES (?, ?, ?)", 
+                    (url, body, time.time())
+                )
+        except (OSError, sqlite3.Error):
+            pass